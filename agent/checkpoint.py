@@ -0,0 +1,180 @@
+import io
+import os
+import queue
+import random
+import threading
+
+import numpy as np
+import torch
+
+from agent.dqn_agent import MemmapReplayBuffer, PrioritizedReplayBuffer
+
+REPLAY_ARRAYS = ("states", "actions", "rewards", "next_states", "dones")
+
+
+# ------------------------------
+# Snapshot / Restore
+# ------------------------------
+def snapshot(agent, episode):
+    """
+    Copy everything needed to resume training into plain host memory:
+    networks, optimizer, epsilon, t_step, replay contents and all RNG states.
+    Cheap enough to take on the training thread; writing happens elsewhere.
+    """
+
+    def cpu_state(module):
+        return {k: v.detach().cpu().clone() for k, v in module.state_dict().items()}
+
+    memory = agent.memory
+    state = {
+        "episode": episode,
+        "qnetwork_local": cpu_state(agent.qnetwork_local),
+        "qnetwork_target": cpu_state(agent.qnetwork_target),
+        "optimizer": _clone(agent.optimizer.state_dict()),
+        "epsilon": agent.epsilon,
+        "t_step": agent.t_step,
+        "replay": {
+            "pos": memory.pos,
+            "size": memory.size,
+            "rng": memory.rng.bit_generator.state,
+        },
+        "rng": {
+            "python": random.getstate(),
+            "numpy": np.random.get_state(),
+            "torch": torch.get_rng_state(),
+            "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+        },
+    }
+
+    if isinstance(memory, MemmapReplayBuffer):
+        # contents already live on disk; only the cursor state is needed.
+        # Writes after this point overwrite the oldest slots, which
+        # load_checkpoint drops using the on-disk write count.
+        memory.flush()
+        state["replay"].update(pending_next=memory._pending_next,
+                               buffer_size=memory.buffer_size, written=memory.written)
+        return state, {}
+
+    # replay contents are stored as bulk arrays, not pickled
+    arrays = {name: getattr(memory, name)[:memory.size].copy() for name in REPLAY_ARRAYS}
+    if isinstance(memory, PrioritizedReplayBuffer):
+        arrays["tree"] = memory.tree.tree.copy()
+        state["replay"].update(max_priority=memory.max_priority, beta=memory.beta)
+
+    return state, arrays
+
+
+def _clone(obj):
+    if torch.is_tensor(obj):
+        return obj.detach().cpu().clone()
+    if isinstance(obj, dict):
+        return {k: _clone(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clone(v) for v in obj]
+    return obj
+
+
+def save_checkpoint(path, state, arrays):
+    """Write one .npz atomically: temp file in the same directory, then rename."""
+    blob = io.BytesIO()
+    torch.save(state, blob)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, state=np.frombuffer(blob.getbuffer(), dtype=np.uint8), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, agent):
+    """Restore agent and RNG state in place; returns the next episode index."""
+    with np.load(path) as data:
+        state = torch.load(io.BytesIO(data["state"].tobytes()), weights_only=False)
+        arrays = {name: data[name] for name in data.files if name != "state"}
+
+    agent.qnetwork_local.load_state_dict(state["qnetwork_local"])
+    agent.qnetwork_target.load_state_dict(state["qnetwork_target"])
+    agent.optimizer.load_state_dict(state["optimizer"])
+    agent.epsilon = state["epsilon"]
+    agent.t_step = state["t_step"]
+
+    memory = agent.memory
+    size = state["replay"]["size"]
+    if isinstance(memory, MemmapReplayBuffer):
+        if memory.buffer_size != state["replay"]["buffer_size"]:
+            raise ValueError(
+                f"checkpoint replay buffer_size is {state['replay']['buffer_size']}, "
+                f"but the agent's memmap buffer has {memory.buffer_size}"
+            )
+        # slots [pos, pos + overwritten) were rewritten after the checkpoint;
+        # the newest checkpointed slot is relinked by the next add
+        overwritten = memory.written - state["replay"]["written"]
+        if overwritten < 0:
+            raise ValueError("memmap replay files are older than the checkpoint")
+        size = max(0, min(size, memory.buffer_size - overwritten))
+        memory._pending_next = state["replay"]["pending_next"] if size else None
+    else:
+        for name in REPLAY_ARRAYS:
+            getattr(memory, name)[:size] = arrays[name]
+    memory.pos = state["replay"]["pos"]
+    memory.size = size
+    memory.rng.bit_generator.state = state["replay"]["rng"]
+    if isinstance(memory, PrioritizedReplayBuffer):
+        memory.tree.tree[:] = arrays["tree"]
+        memory.max_priority = state["replay"]["max_priority"]
+        memory.beta = state["replay"]["beta"]
+
+    rng = state["rng"]
+    random.setstate(rng["python"])
+    np.random.set_state(rng["numpy"])
+    torch.set_rng_state(rng["torch"])
+    if rng["cuda"] is not None and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(rng["cuda"])
+
+    return state["episode"] + 1
+
+
+# ------------------------------
+# Background Writer
+# ------------------------------
+class AsyncCheckpointer:
+    """
+    Writes snapshots on a background thread so serialization and disk I/O
+    don't stall training. If a write is still in flight, the newer snapshot
+    replaces the queued one instead of piling up.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue(maxsize=1)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                save_checkpoint(self.path, *item)
+            except Exception as exc:  # surfaced on the next submit/close
+                self.error = exc
+
+    def submit(self, agent, episode):
+        if self.error is not None:
+            raise self.error
+
+        item = snapshot(agent, episode)
+        try:
+            self.queue.get_nowait()  # drop a stale, not yet written snapshot
+        except queue.Empty:
+            pass
+        self.queue.put(item)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,276 @@
+import multiprocessing as mp
+import queue
+import random
+import time
+
+import numpy as np
+import torch
+
+from env.traffic_env import TrafficEnv
+from env.event_env import EventTrafficEnv
+from agent.dqn_agent import DQNAgent, QNetwork
+
+
+# ------------------------------
+# Shared Weight Buffer
+# ------------------------------
+class SharedWeights:
+    """
+    Flat float32 copy of QNetwork parameters in shared memory. The learner
+    publishes into it; actors pull only when the version counter changed.
+    """
+
+    def __init__(self, ctx, network):
+        numel = sum(p.numel() for p in network.parameters())
+        self.buffer = ctx.Array("f", numel, lock=False)
+        self.version = ctx.Value("i", 0)
+        self.lock = ctx.Lock()
+
+    def publish(self, network):
+        flat = torch.nn.utils.parameters_to_vector(network.parameters())
+        flat = flat.detach().cpu().numpy()
+        with self.lock:
+            np.frombuffer(self.buffer, dtype=np.float32)[:] = flat
+            self.version.value += 1
+
+    def pull(self, network, seen_version):
+        if self.version.value == seen_version:
+            return seen_version
+
+        with self.lock:
+            flat = np.frombuffer(self.buffer, dtype=np.float32).copy()
+            version = self.version.value
+        torch.nn.utils.vector_to_parameters(
+            torch.from_numpy(flat), network.parameters()
+        )
+        return version
+
+
+ENGINES = {"step": TrafficEnv, "event": EventTrafficEnv}
+
+
+def actor_epsilon(actor_id, num_actors, base=0.4, alpha=7.0):
+    """Ape-X style per-actor exploration rate."""
+    if num_actors == 1:
+        return base
+    return base ** (1 + alpha * actor_id / (num_actors - 1))
+
+
+# ------------------------------
+# Actor Process
+# ------------------------------
+def run_actor(actor_id, epsilon, state_size, action_size, weights, slots,
+              num_slots, chunk, free_slots, filled, stop, max_steps,
+              threads, seed, engine="step"):
+    torch.set_num_threads(threads)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    # transition row layout: state | action | reward | next_state | done
+    width = 2 * state_size + 3
+    slot_view = np.frombuffer(slots, dtype=np.float32).reshape(num_slots, chunk, width)
+
+    env = ENGINES[engine]()
+    network = QNetwork(state_size, action_size)
+    network.eval()
+    version = weights.pull(network, -1)
+
+    def next_free_slot():
+        while not stop.is_set():
+            try:
+                return free_slots.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    slot = next_free_slot()
+    n = 0
+    finished = []
+
+    while slot is not None:
+        state = env.reset()
+        total_reward = 0
+
+        for _ in range(max_steps):
+            if random.random() < epsilon:
+                action = random.randrange(action_size)
+            else:
+                with torch.no_grad():
+                    q_values = network(torch.from_numpy(state).unsqueeze(0))
+                action = torch.argmax(q_values).item()
+
+            next_state, reward, done = env.step(action)
+
+            row = slot_view[slot, n]
+            row[:state_size] = state
+            row[state_size] = action
+            row[state_size + 1] = reward
+            row[state_size + 2:-1] = next_state
+            row[-1] = done
+            n += 1
+
+            state = next_state
+            total_reward += reward
+
+            if n == chunk:
+                filled.put((actor_id, slot, n, finished))
+                finished = []
+                n = 0
+                slot = next_free_slot()
+                if slot is None:
+                    break
+                version = weights.pull(network, version)
+
+            if done:
+                break
+
+        finished.append(total_reward)
+
+    filled.cancel_join_thread()
+
+
+# ------------------------------
+# Learner
+# ------------------------------
+def train_distributed(episodes, num_actors, max_steps=200, chunk=50,
+                      slots_per_actor=4, publish_every=10, actor_threads=1,
+                      learner_threads=None, seed=0, engine="step", agent_kwargs=None,
+                      log=print):
+    """
+    Run num_actors rollout processes (TrafficEnv, or EventTrafficEnv with
+    engine="event") feeding one DQNAgent learner built with agent_kwargs.
+
+    Actors write transitions into per-actor shared-memory slots and only pass
+    slot indices through queues. The learner never exceeds the single-process
+    replay ratio (agent.gradient_steps updates per agent.update_every
+    transitions) and does not throttle the actors when it falls behind;
+    instead it works off the remaining update budget once the actors stop,
+    so a run makes as many updates as single-process training would.
+    """
+
+    ctx = mp.get_context("spawn")
+    if learner_threads:
+        torch.set_num_threads(learner_threads)
+
+    state_size = len(ENGINES[engine]().reset())
+    action_size = 12
+    width = 2 * state_size + 3
+
+    agent = DQNAgent(state_size, action_size, **(agent_kwargs or {}))
+    weights = SharedWeights(ctx, agent.qnetwork_local)
+    weights.publish(agent.qnetwork_local)
+
+    stop = ctx.Event()
+    filled = ctx.Queue()
+    slot_views, free_queues, epsilons, actors = [], [], [], []
+
+    for actor_id in range(num_actors):
+        slots = ctx.Array("f", slots_per_actor * chunk * width, lock=False)
+        free_slots = ctx.Queue()
+        for slot in range(slots_per_actor):
+            free_slots.put(slot)
+
+        epsilon = actor_epsilon(actor_id, num_actors)
+        process = ctx.Process(
+            target=run_actor,
+            args=(actor_id, epsilon, state_size, action_size, weights, slots,
+                  slots_per_actor, chunk, free_slots, filled, stop,
+                  max_steps, actor_threads, seed + actor_id, engine),
+            daemon=True
+        )
+        process.start()
+
+        slot_views.append(
+            np.frombuffer(slots, dtype=np.float32).reshape(slots_per_actor, chunk, width)
+        )
+        free_queues.append(free_slots)
+        epsilons.append(epsilon)
+        actors.append(process)
+
+    completed = 0
+    received = 0
+    learn_steps = 0
+    start = time.perf_counter()
+
+    def check_actors():
+        exitcodes = [process.exitcode for process in actors]
+        failed = [i for i, code in enumerate(exitcodes) if code not in (None, 0)]
+        if failed:
+            raise RuntimeError(
+                f"actor process(es) {failed} exited with code(s) "
+                f"{[exitcodes[i] for i in failed]}"
+            )
+        if all(code is not None for code in exitcodes):
+            raise RuntimeError("all actor processes exited before training finished")
+
+    def receive(block):
+        nonlocal completed, received
+        try:
+            message = filled.get(timeout=1.0) if block else filled.get_nowait()
+        except queue.Empty:
+            if block:
+                check_actors()
+            return False
+
+        actor_id, slot, n, finished = message
+        rows = slot_views[actor_id][slot, :n]
+        agent.memory.add_batch(
+            rows[:, :state_size],
+            rows[:, state_size],
+            rows[:, state_size + 1],
+            rows[:, state_size + 2:-1],
+            rows[:, -1]
+        )
+        free_queues[actor_id].put(slot)
+        received += n
+
+        for total_reward in finished:
+            completed += 1
+            if completed <= episodes:
+                log(
+                    f"Episode {completed}/{episodes} | "
+                    f"Total Reward: {round(total_reward, 2)} | "
+                    f"Actor: {actor_id} (epsilon {round(epsilons[actor_id], 3)})"
+                )
+        return True
+
+    def behind():
+        return (len(agent.memory) >= agent.batch_size
+                and learn_steps * agent.update_every < received * agent.gradient_steps)
+
+    try:
+        while completed < episodes:
+            can_learn = behind()
+
+            if not receive(block=not can_learn) and not can_learn:
+                continue
+            while receive(block=False):
+                pass
+
+            if can_learn:
+                agent.learn_from_memory()
+                learn_steps += 1
+                if learn_steps % publish_every == 0:
+                    weights.publish(agent.qnetwork_local)
+    finally:
+        stop.set()
+        for process in actors:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    # catch up on the replay-ratio budget of everything the actors sent
+    caught_up = learn_steps
+    while behind():
+        agent.learn_from_memory()
+        learn_steps += 1
+    caught_up = learn_steps - caught_up
+
+    elapsed = time.perf_counter() - start
+    log(
+        f"{num_actors} actors | {received} env steps in {elapsed:.1f}s "
+        f"({received / elapsed:.0f} steps/s) | {learn_steps} updates "
+        f"({caught_up} after the actors stopped)"
+    )
+    return agent
@@ -1,9 +1,9 @@
+import os
 import random
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from collections import deque
 
 # ------------------------------
 # Q-Network (Neural Brain)
@@ -26,45 +26,420 @@ class QNetwork(nn.Module):
 # Replay Buffer (Memory)
 # ------------------------------
 class ReplayBuffer:
-    def __init__(self, buffer_size=100000):
-        self.memory = deque(maxlen=buffer_size)
+    """
+    Ring buffer backed by preallocated, contiguous arrays.
+
+    sample() gathers a batch into reusable staging tensors (optionally in
+    pinned memory) and returns them without further copies, so the returned
+    tensors are only valid until the next call to sample().
+
+    With n_step > 1, sample() returns n-step returns in place of rewards,
+    the state n steps ahead as next_state, and a sixth tensor holding the
+    bootstrap discount gamma ** k for the k steps actually used.
+    """
+
+    def __init__(self, state_size, buffer_size=100000, pin_memory=False, seed=None,
+                 n_step=1, gamma=0.99):
+        self.buffer_size = buffer_size
+        self.state_size = state_size
+        self.rng = np.random.default_rng(seed)
+        self.n_step = n_step
+        self.gamma = gamma
+
+        self.states = np.zeros((buffer_size, state_size), dtype=np.float32)
+        self.actions = np.zeros(buffer_size, dtype=np.int64)
+        self.rewards = np.zeros(buffer_size, dtype=np.float32)
+        self.next_states = np.zeros((buffer_size, state_size), dtype=np.float32)
+        self.dones = np.zeros(buffer_size, dtype=np.float32)
+
+        self.pos = 0
+        self.size = 0
+
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._staging_size = None
 
     def add(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        i = self.pos
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
 
-    def sample(self, batch_size):
-        batch = random.sample(self.memory, batch_size)
+        self.pos = (i + 1) % self.buffer_size
+        self.size = min(self.size + 1, self.buffer_size)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        n = len(actions)
+        if n > self.buffer_size:
+            # only the newest transitions would survive anyway
+            skip = n - self.buffer_size
+            self.pos = (self.pos + skip) % self.buffer_size
+            states, actions, rewards = states[skip:], actions[skip:], rewards[skip:]
+            next_states, dones = next_states[skip:], dones[skip:]
+            n = self.buffer_size
+
+        idx = (self.pos + np.arange(n)) % self.buffer_size
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
 
-        states, actions, rewards, next_states, dones = zip(*batch)
+        self.pos = (self.pos + n) % self.buffer_size
+        self.size = min(self.size + n, self.buffer_size)
 
-        return (
-            torch.FloatTensor(states),
-            torch.LongTensor(actions),
-            torch.FloatTensor(rewards),
-            torch.FloatTensor(next_states),
-            torch.FloatTensor(dones)
+    def _allocate_staging(self, batch_size):
+        state_size = self.state_size
+
+        def empty(*shape, dtype=torch.float32):
+            return torch.empty(shape, dtype=dtype, pin_memory=self.pin_memory)
+
+        self._staging = (
+            empty(batch_size, state_size),
+            empty(batch_size, dtype=torch.int64),
+            empty(batch_size),
+            empty(batch_size, state_size),
+            empty(batch_size),
+            empty(batch_size)
         )
+        # NumPy views sharing memory with the staging tensors
+        self._staging_np = tuple(t.numpy() for t in self._staging)
+        self._staging_size = batch_size
+
+    def sample_indices(self, batch_size):
+        return self.rng.integers(0, self.size, size=batch_size)
+
+    def gather(self, idx):
+        if self._staging_size != len(idx):
+            self._allocate_staging(len(idx))
+        if self.n_step > 1:
+            return self._gather_nstep(idx)
+
+        s, a, r, ns, d, _ = self._staging_np
+        np.take(self.states, idx, axis=0, out=s)
+        np.take(self.actions, idx, out=a)
+        np.take(self.rewards, idx, out=r)
+        np.take(self.next_states, idx, axis=0, out=ns)
+        np.take(self.dones, idx, out=d)
+        return self._staging[:5]
+
+    def _gather_nstep(self, idx):
+        """
+        n-step returns by index arithmetic: slot idx + k belongs to the same
+        episode if slot idx + k - 1 was not terminal, its next_state equals
+        slot idx + k's state, and idx + k is not newer than the newest slot.
+        """
+        n = self.n_step
+        steps = (idx[:, None] + np.arange(n)) % self.buffer_size        # (B, n)
+        age = (idx - (self.pos - self.size)) % self.buffer_size          # 0 = oldest
+
+        valid = np.ones(steps.shape, dtype=bool)
+        continues = (
+            (self.dones[steps[:, :-1]] == 0)
+            & (self.next_states[steps[:, :-1]] == self.states[steps[:, 1:]]).all(axis=2)
+            & (age[:, None] + np.arange(1, n) < self.size)
+        )
+        valid[:, 1:] = np.logical_and.accumulate(continues, axis=1)
+
+        discounts = self.gamma ** np.arange(n)
+        returns = (self.rewards[steps] * valid * discounts).sum(axis=1)
+        used = valid.sum(axis=1)
+        last = steps[np.arange(len(idx)), used - 1]
+
+        s, a, r, ns, d, g = self._staging_np
+        np.take(self.states, idx, axis=0, out=s)
+        np.take(self.actions, idx, out=a)
+        r[:] = returns
+        np.take(self.next_states, last, axis=0, out=ns)
+        np.take(self.dones, last, out=d)
+        g[:] = self.gamma ** used
+        return self._staging
+
+    def sample(self, batch_size):
+        return self.gather(self.sample_indices(batch_size))
 
     def __len__(self):
-        return len(self.memory)
+        return self.size
+
+
+# ------------------------------
+# Prioritized Replay (Sum-Tree)
+# ------------------------------
+class SumTree:
+    """
+    Array-based binary sum-tree. Leaves hold priorities, every internal node
+    holds the sum of its children, so proportional sampling and priority
+    updates are O(log n). Both operations are vectorized over a whole batch.
+    """
+
+    def __init__(self, capacity):
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx) + self.leaves
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.leaves
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.leaves]
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay (Schaul et al.). sample() returns the
+    usual experience tuple plus buffer indices and importance-sampling
+    weights; update_priorities() feeds TD errors back into the tree.
+    """
+
+    def __init__(self, state_size, buffer_size=100000, alpha=0.6,
+                 beta=0.4, beta_increment=1e-4, eps=1e-6, **kwargs):
+        super().__init__(state_size, buffer_size, **kwargs)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+
+        self.tree = SumTree(buffer_size)
+        self.max_priority = 1.0
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.pos
+        super().add(state, action, reward, next_state, done)
+        self.tree.update([i], self.max_priority ** self.alpha)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        super().add_batch(states, actions, rewards, next_states, dones)
+        n = min(len(actions), self.buffer_size)
+        idx = (self.pos - n + np.arange(n)) % self.buffer_size
+        self.tree.update(idx, self.max_priority ** self.alpha)
+
+    def sample_indices(self, batch_size):
+        # stratified sampling: one uniform draw per equal-mass segment
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = self.tree.find(values)
+        return np.minimum(idx, self.size - 1)
+
+    def sample(self, batch_size):
+        idx = self.sample_indices(batch_size)
+
+        probs = self.tree.get(idx) / self.tree.total()
+        weights = (self.size * probs) ** (-self.beta)
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        experiences = self.gather(idx)
+        return experiences, idx, torch.from_numpy(weights.astype(np.float32))
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
+
+
+# ------------------------------
+# Disk-backed Compact Replay
+# ------------------------------
+class MemmapReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer for very large capacities, stored in np.memmap files.
+
+    Each observation is stored once: the next_state of slot i is the state
+    of slot i + 1 whenever the episode continued, and is only written to a
+    separate (sparse) file at episode boundaries. TrafficEnv observations
+    are quantized losslessly: queues (x50, <= max_queue) and the green lane
+    (x3) as uint8, wait times (x100) as uint16. About 20 bytes/transition.
+
+    The newest slot's successor is not known yet, so it is never sampled.
+    A running count of transitions ever added is kept on disk too, so a
+    checkpoint restore can tell which slots were overwritten after it.
+    """
+
+    QUEUE_SCALE = 50
+    WAIT_SCALE = 100
+    GREEN_SCALE = 3
+
+    def __init__(self, state_size, buffer_size, directory, pin_memory=False, seed=None):
+        if state_size != 9:
+            raise ValueError("MemmapReplayBuffer stores the 9-value TrafficEnv observation")
+
+        self.buffer_size = buffer_size
+        self.state_size = state_size
+        self.directory = directory
+        self.rng = np.random.default_rng(seed)
+        os.makedirs(directory, exist_ok=True)
+
+        def memmap(name, dtype, shape):
+            path = os.path.join(directory, f"{name}.dat")
+            mode = "r+" if os.path.exists(path) else "w+"
+            return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+        # obs_u8: 4 queues + green lane, obs_u16: 4 wait times
+        self.obs_u8 = memmap("obs_u8", np.uint8, (buffer_size, 5))
+        self.obs_u16 = memmap("obs_u16", np.uint16, (buffer_size, 4))
+        self.next_u8 = memmap("next_u8", np.uint8, (buffer_size, 5))
+        self.next_u16 = memmap("next_u16", np.uint16, (buffer_size, 4))
+        self.actions = memmap("actions", np.uint8, (buffer_size,))
+        self.rewards = memmap("rewards", np.float32, (buffer_size,))
+        self.dones = memmap("dones", np.bool_, (buffer_size,))
+        self.continues = memmap("continues", np.bool_, (buffer_size,))
+        self._written = memmap("written", np.int64, (1,))
+
+        self.pos = 0
+        self.size = 0
+        self._pending_next = None  # quantized next_state of the newest slot
+
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._staging_size = None
+
+    def _quantize(self, states):
+        states = np.asarray(states, dtype=np.float64).reshape(-1, 9)
+        u8 = np.empty((len(states), 5), dtype=np.uint8)
+        u8[:, :4] = np.rint(states[:, :4] * self.QUEUE_SCALE)
+        u8[:, 4] = np.rint(states[:, 8] * self.GREEN_SCALE)
+        u16 = np.rint(states[:, 4:8] * self.WAIT_SCALE).astype(np.uint16)
+        return u8, u16
+
+    def _dequantize(self, u8, u16, out):
+        out[:, :4] = u8[:, :4] / self.QUEUE_SCALE
+        out[:, 4:8] = u16 / self.WAIT_SCALE
+        out[:, 8] = u8[:, 4] / self.GREEN_SCALE
+
+    def _link_previous(self, first_u8, first_u16):
+        """Resolve the previous newest slot now that the next state is known."""
+        if self._pending_next is None:
+            return
+        prev = (self.pos - 1) % self.buffer_size
+        next_u8, next_u16 = self._pending_next
+        linked = np.array_equal(next_u8, first_u8) and np.array_equal(next_u16, first_u16)
+        self.continues[prev] = linked
+        if not linked:
+            self.next_u8[prev] = next_u8
+            self.next_u16[prev] = next_u16
+
+    def add(self, state, action, reward, next_state, done):
+        self.add_batch([state], [action], [reward], [next_state], [done])
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        s_u8, s_u16 = self._quantize(states)
+        n_u8, n_u16 = self._quantize(next_states)
+        actions = np.asarray(actions)
+        rewards = np.asarray(rewards)
+        dones = np.asarray(dones)
+
+        self._link_previous(s_u8[0], s_u16[0])
+
+        n = len(s_u8)
+        self._written[0] += n
+        if n > self.buffer_size:
+            skip = n - self.buffer_size
+            self.pos = (self.pos + skip) % self.buffer_size
+            s_u8, s_u16, n_u8, n_u16 = s_u8[skip:], s_u16[skip:], n_u8[skip:], n_u16[skip:]
+            actions, rewards, dones = actions[skip:], rewards[skip:], dones[skip:]
+            n = self.buffer_size
+
+        idx = (self.pos + np.arange(n)) % self.buffer_size
+        self.obs_u8[idx] = s_u8
+        self.obs_u16[idx] = s_u16
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.dones[idx] = dones
+
+        # within the batch, row k continues into row k + 1 when they match
+        linked = np.zeros(n, dtype=bool)
+        linked[:-1] = (n_u8[:-1] == s_u8[1:]).all(axis=1) & (n_u16[:-1] == s_u16[1:]).all(axis=1)
+        self.continues[idx] = linked
+        boundary = idx[:-1][~linked[:-1]]
+        self.next_u8[boundary] = n_u8[:-1][~linked[:-1]]
+        self.next_u16[boundary] = n_u16[:-1][~linked[:-1]]
+
+        self._pending_next = (n_u8[-1], n_u16[-1])
+        self.pos = (self.pos + n) % self.buffer_size
+        self.size = min(self.size + n, self.buffer_size)
+
+    @property
+    def written(self):
+        """Transitions ever added to the files in this directory."""
+        return int(self._written[0])
+
+    def sample_indices(self, batch_size):
+        # oldest .. second newest slot
+        offsets = self.rng.integers(0, self.size - 1, size=batch_size)
+        return (self.pos - self.size + offsets) % self.buffer_size
+
+    def gather(self, idx):
+        if self._staging_size != len(idx):
+            self._allocate_staging(len(idx))
+
+        s, a, r, ns, d, _ = self._staging_np
+        self._dequantize(self.obs_u8[idx], self.obs_u16[idx], s)
+        a[:] = self.actions[idx]
+        r[:] = self.rewards[idx]
+        d[:] = self.dones[idx]
+
+        # next_state: successor slot's state, or the stored boundary state
+        linked = self.continues[idx]
+        succ = (idx + 1) % self.buffer_size
+        next_u8 = np.where(linked[:, None], self.obs_u8[succ], self.next_u8[idx])
+        next_u16 = np.where(linked[:, None], self.obs_u16[succ], self.next_u16[idx])
+        self._dequantize(next_u8, next_u16, ns)
+        return self._staging[:5]
+
+    def flush(self):
+        for array in (self.obs_u8, self.obs_u16, self.next_u8, self.next_u16,
+                      self.actions, self.rewards, self.dones, self.continues, self._written):
+            array.flush()
 
 
 # ------------------------------
 # DQN Agent
 # ------------------------------
 class DQNAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, prioritized=False,
+                 buffer_size=100000, replay_dir=None, n_step=1, double_dqn=False,
+                 gamma=0.99, lr=0.0005, epsilon_decay=0.995, batch_size=64,
+                 update_every=4, tau=0.01, gradient_steps=1, epsilon_schedule="update",
+                 compile=False):
         self.state_size = state_size
         self.action_size = action_size
 
-        self.gamma = 0.99
+        self.gamma = gamma
         self.epsilon = 1.0
         self.epsilon_min = 0.05
-        self.epsilon_decay = 0.995
-        self.lr = 0.0005
+        self.epsilon_decay = epsilon_decay
+        self.lr = lr
+
+        self.batch_size = batch_size
+        self.update_every = update_every
+        self.tau = tau
+        self.gradient_steps = gradient_steps  # gradient steps per update_every trigger
 
-        self.batch_size = 64
-        self.update_every = 4
+        # "update": decay once per learning trigger (the original behaviour)
+        # "episode": decay only when the caller reports end_episode()
+        if epsilon_schedule not in ("update", "episode"):
+            raise ValueError("epsilon_schedule must be 'update' or 'episode'")
+        self.epsilon_schedule = epsilon_schedule
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -72,8 +447,37 @@ class DQNAgent:
         self.qnetwork_target = QNetwork(state_size, action_size).to(self.device)
         self.optimizer = optim.Adam(self.qnetwork_local.parameters(), lr=self.lr)
 
-        self.memory = ReplayBuffer()
+        # parameter lists for the multi-tensor Polyak update
+        self._local_params = list(self.qnetwork_local.parameters())
+        self._target_params = list(self.qnetwork_target.parameters())
+
+        # batches are copied into persistent device buffers instead of
+        # allocating new device tensors each update (CPU uses staging as is)
+        self._device_batch = None
+
+        self._td_loss_fn = torch.compile(self._td_loss) if compile else self._td_loss
+
+        self.prioritized = prioritized
+        self.n_step = n_step
+        self.double_dqn = double_dqn
+
+        if replay_dir and (prioritized or n_step > 1):
+            raise ValueError("replay_dir supports neither prioritized nor n-step replay")
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(
+                state_size, buffer_size, n_step=n_step, gamma=self.gamma
+            )
+        elif replay_dir:
+            self.memory = MemmapReplayBuffer(state_size, buffer_size, replay_dir)
+        else:
+            self.memory = ReplayBuffer(
+                state_size, buffer_size, n_step=n_step, gamma=self.gamma
+            )
         self.t_step = 0
+        self.last_loss = None  # detached tensor; read without forcing a sync
+        # running totals over every gradient step, for per-episode logging
+        self.updates = 0
+        self.loss_sum = torch.zeros((), device=self.device)
 
     def act(self, state):
         if random.random() < self.epsilon:
@@ -89,39 +493,88 @@ class DQNAgent:
 
         self.t_step = (self.t_step + 1) % self.update_every
         if self.t_step == 0 and len(self.memory) >= self.batch_size:
-            experiences = self.memory.sample(self.batch_size)
-            self.learn(experiences)
+            for _ in range(self.gradient_steps):
+                self.learn_from_memory()
+
+            if self.epsilon_schedule == "update":
+                self.decay_epsilon()
+
+    def learn_from_memory(self):
+        """One gradient step on a batch sampled from replay (uniform or prioritized)."""
+        if self.prioritized:
+            experiences, indices, weights = self.memory.sample(self.batch_size)
+            self.learn(experiences, indices, weights)
+        else:
+            self.learn(self.memory.sample(self.batch_size))
+
+    def end_episode(self):
+        if self.epsilon_schedule == "episode":
+            self.decay_epsilon()
+
+    def decay_epsilon(self):
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+    def _to_device(self, tensors):
+        if self.device.type == "cpu":
+            return tensors
+        if self._device_batch is None or len(self._device_batch) != len(tensors) \
+                or self._device_batch[0].shape != tensors[0].shape:
+            self._device_batch = [torch.empty_like(t, device=self.device) for t in tensors]
+        for buffer, tensor in zip(self._device_batch, tensors):
+            buffer.copy_(tensor)
+        return self._device_batch
 
-    def learn(self, experiences):
-        states, actions, rewards, next_states, dones = experiences
+    def _td_loss(self, states, actions, rewards, next_states, dones, discounts, weights):
+        with torch.no_grad():
+            if self.double_dqn:
+                # Double DQN: local network selects, target network evaluates
+                next_actions = self.qnetwork_local(next_states).argmax(1, keepdim=True)
+                Q_targets_next = self.qnetwork_target(next_states).gather(1, next_actions).squeeze(1)
+            else:
+                Q_targets_next = self.qnetwork_target(next_states).max(1)[0]
+            Q_targets = rewards + (discounts * Q_targets_next * (1 - dones))
+
+        Q_expected = self.qnetwork_local(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        td_errors = Q_targets - Q_expected
 
-        states = states.to(self.device)
-        actions = actions.to(self.device)
-        rewards = rewards.to(self.device)
-        next_states = next_states.to(self.device)
-        dones = dones.to(self.device)
+        if weights is None:
+            loss = td_errors.pow(2).mean()  # same as nn.MSELoss
+        else:
+            # importance-sampling corrected loss for prioritized replay
+            loss = (weights * td_errors.pow(2)).mean()
+        return loss, td_errors
 
-        Q_targets_next = self.qnetwork_target(next_states).detach().max(1)[0]
-        Q_targets = rewards + (self.gamma * Q_targets_next * (1 - dones))
+    def learn(self, experiences, indices=None, weights=None):
+        batch = list(experiences)
+        if weights is not None:
+            batch.append(weights)
+        batch = self._to_device(batch)
 
-        Q_expected = self.qnetwork_local(states).gather(1, actions.unsqueeze(1)).squeeze()
+        states, actions, rewards, next_states, dones = batch[:5]
+        # n-step batches carry their own bootstrap discount gamma ** k
+        discounts = batch[5] if len(experiences) > 5 else self.gamma
 
-        loss = nn.MSELoss()(Q_expected, Q_targets)
+        loss, td_errors = self._td_loss_fn(
+            states, actions, rewards, next_states, dones, discounts,
+            batch[-1] if weights is not None else None
+        )
+        if weights is not None:
+            self.memory.update_priorities(
+                indices, td_errors.detach().cpu().numpy()
+            )
 
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        self.last_loss = loss.detach()
+        self.loss_sum += self.last_loss
+        self.updates += 1
 
         self.soft_update()
 
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
-
-    def soft_update(self, tau=0.01):
-        for target_param, local_param in zip(
-            self.qnetwork_target.parameters(),
-            self.qnetwork_local.parameters()
-        ):
-            target_param.data.copy_(
-                tau * local_param.data + (1.0 - tau) * target_param.data
-            )
+    def soft_update(self, tau=None):
+        """Polyak update target <- tau * local + (1 - tau) * target in one fused call."""
+        tau = self.tau if tau is None else tau
+        with torch.no_grad():
+            torch._foreach_lerp_(self._target_params, self._local_params, tau)
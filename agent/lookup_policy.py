@@ -0,0 +1,156 @@
+"""
+Compile the trained QNetwork into a lookup table of greedy actions.
+
+Every TrafficEnv observation is bounded: 4 queues in 0..max_queue, 4 wait
+counters and the green lane. The compiler quantizes each queue and wait
+counter into bins, evaluates the network once at a representative point
+of every grid cell and stores the argmax as uint8. A controller then needs
+only threshold comparisons and one array index per decision.
+
+Run from the repository root:
+    python -m agent.lookup_policy dqn_traffic_model.pth dqn_traffic_lut.npz
+    python -m agent.lookup_policy dqn_traffic_model.npy dqn_traffic_lut.npz \\
+        --queue-edges 0 5 10 18 30 45 --wait-edges 0 1 3 6
+
+Bin edges are lower bounds in raw units (vehicles, steps); a value falls
+into the last bin whose edge it reaches. The table is indexed
+[green, q0, q1, q2, q3, w0, w1, w2, w3] in row-major order.
+"""
+import argparse
+
+import numpy as np
+
+from agent.numpy_policy import NumpyPolicy, flatten_checkpoint
+
+NUM_LANES = 4
+MAX_QUEUE = 50
+QUEUE_SCALE = 50   # observation = queue / 50
+WAIT_SCALE = 100   # observation = wait / 100
+
+QUEUE_EDGES = (0, 5, 10, 18, 30, 45)
+WAIT_EDGES = (0, 1, 3, 6)
+
+
+def _representatives(edges, upper):
+    """Midpoint of each integer bin [edge, next_edge - 1]; the last ends at upper."""
+    bounds = list(edges[1:]) + [upper + 1]
+    return np.array([(lo + hi - 1) / 2 for lo, hi in zip(edges, bounds)])
+
+
+def compile_table(q_values, queue_edges=QUEUE_EDGES, wait_edges=WAIT_EDGES, chunk=65536):
+    """Greedy action of `q_values` (batch of observations -> Q) at every grid cell."""
+    queue_points = _representatives(queue_edges, MAX_QUEUE) / QUEUE_SCALE
+    wait_points = _representatives(wait_edges, 2 * wait_edges[-1]) / WAIT_SCALE
+    green_points = np.arange(NUM_LANES) / (NUM_LANES - 1)
+
+    axes = [green_points] + [queue_points] * NUM_LANES + [wait_points] * NUM_LANES
+    shape = tuple(len(a) for a in axes)
+    table = np.empty(int(np.prod(shape)), dtype=np.uint8)
+
+    for start in range(0, len(table), chunk):
+        cells = np.unravel_index(np.arange(start, min(start + chunk, len(table))), shape)
+        states = np.empty((len(cells[0]), 2 * NUM_LANES + 1), dtype=np.float32)
+        # observation layout: queues, waits, green
+        for dim, (axis, idx) in enumerate(zip(axes, cells)):
+            column = 2 * NUM_LANES if dim == 0 else dim - 1
+            states[:, column] = axis[idx]
+        table[start:start + len(states)] = q_values(states).argmax(axis=1)
+
+    return table.reshape(shape)
+
+
+class LookupPolicy:
+    """Array-indexed controller with the same act() interface as NumpyPolicy."""
+
+    def __init__(self, table, queue_edges, wait_edges):
+        self.table = table
+        self.queue_edges = np.asarray(queue_edges)
+        self.wait_edges = np.asarray(wait_edges)
+        # thresholds in observation units, so observations need no rescaling
+        self._queue_thresholds = self.queue_edges[1:] / QUEUE_SCALE
+        self._wait_thresholds = self.wait_edges[1:] / WAIT_SCALE
+        self._flat = table.reshape(-1)
+
+    @classmethod
+    def compile(cls, q_values, queue_edges=QUEUE_EDGES, wait_edges=WAIT_EDGES):
+        return cls(compile_table(q_values, queue_edges, wait_edges), queue_edges, wait_edges)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["table"], data["queue_edges"], data["wait_edges"])
+
+    def save(self, path):
+        np.savez(path, table=self.table, queue_edges=self.queue_edges,
+                 wait_edges=self.wait_edges)
+
+    def index(self, states):
+        """Flat table index of one observation or a batch of observations."""
+        states = np.atleast_2d(states)
+        # small epsilon absorbs float32 rounding of integer counts
+        queue_bins = np.searchsorted(self._queue_thresholds, states[:, :NUM_LANES] + 1e-6,
+                                     side="right")
+        wait_bins = np.searchsorted(self._wait_thresholds,
+                                    states[:, NUM_LANES:2 * NUM_LANES] + 1e-6, side="right")
+        green = np.rint(states[:, 2 * NUM_LANES] * (NUM_LANES - 1)).astype(np.int64)
+        return np.ravel_multi_index(
+            (green, *queue_bins.T, *wait_bins.T), self.table.shape
+        )
+
+    def act(self, states):
+        """Greedy action for one state (returns int) or a batch (returns array)."""
+        actions = self._flat[self.index(states)]
+        if np.ndim(states) == 1:
+            return int(actions[0])
+        return actions.astype(np.int64)
+
+
+# ------------------------------
+# Agreement Report
+# ------------------------------
+def agreement(policy, lookup, episodes=32, seed=1):
+    """
+    Roll out the full network on held-out arrival streams and compare its
+    action with the table's at every visited state. Also reports the
+    congestion area when the table itself drives the intersections.
+    """
+    from env.vector_env import VectorTrafficEnv
+    import evaluate
+
+    env = VectorTrafficEnv(episodes, seed=seed, auto_reset=False)
+    states = env.reset()
+    matches = total = 0
+    for _ in range(env.episode_length):
+        actions = policy.act(states)
+        matches += int((lookup.act(states) == actions).sum())
+        total += len(actions)
+        states, _, dones = env.step(actions)
+        if dones.all():
+            break
+
+    return {
+        "agreement": matches / total,
+        "network_congestion": float(evaluate.run_numpy_policy_batched(policy, episodes, seed).mean()),
+        "table_congestion": float(evaluate.run_numpy_policy_batched(lookup, episodes, seed).mean()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", help="QNetwork .pth checkpoint or exported .npy weights")
+    parser.add_argument("output", help="lookup table .npz")
+    parser.add_argument("--queue-edges", type=int, nargs="+", default=QUEUE_EDGES)
+    parser.add_argument("--wait-edges", type=int, nargs="+", default=WAIT_EDGES)
+    parser.add_argument("--episodes", type=int, default=32, help="held-out rollouts")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.model.endswith(".npy"):
+        policy = NumpyPolicy.load(args.model)
+    else:
+        policy = NumpyPolicy(flatten_checkpoint(args.model))
+
+    lookup = LookupPolicy.compile(policy.q_values, args.queue_edges, args.wait_edges)
+    lookup.save(args.output)
+    print(f"Wrote {args.output}: table {lookup.table.shape} ({lookup.table.nbytes / 1e6:.1f} MB)")
+    print("Held-out comparison:", agreement(policy, lookup, args.episodes, args.seed))
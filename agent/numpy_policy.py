@@ -0,0 +1,88 @@
+"""
+Torch-free inference for the trained QNetwork.
+
+Export a checkpoint once (needs torch):
+    python -m agent.numpy_policy dqn_traffic_model.pth dqn_traffic_model.npy
+
+Then load it anywhere with only NumPy installed:
+    policy = NumpyPolicy.load("dqn_traffic_model.npy")
+    actions = policy.act(states)
+
+File layout: a single float32 .npy vector. The first three values are the
+layer sizes (state_size, hidden_size, action_size), followed by each
+layer's weight (stored input-major, i.e. transposed) and bias.
+"""
+import sys
+
+import numpy as np
+
+LAYERS = ("fc1", "fc2", "fc3")
+
+
+def flatten_checkpoint(checkpoint_path):
+    """QNetwork .pth state dict -> the flat float32 vector NumpyPolicy reads."""
+    import torch
+
+    state_dict = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+    state_size = state_dict["fc1.weight"].shape[1]
+    hidden_size = state_dict["fc1.weight"].shape[0]
+    action_size = state_dict["fc3.weight"].shape[0]
+
+    parts = [np.array([state_size, hidden_size, action_size], dtype=np.float32)]
+    for name in LAYERS:
+        parts.append(state_dict[f"{name}.weight"].numpy().T.ravel())
+        parts.append(state_dict[f"{name}.bias"].numpy())
+
+    return np.concatenate(parts).astype(np.float32)
+
+
+def export_checkpoint(checkpoint_path, output_path):
+    np.save(output_path, flatten_checkpoint(checkpoint_path))
+
+
+class NumpyPolicy:
+    def __init__(self, flat):
+        state_size, hidden_size, action_size = (int(v) for v in flat[:3])
+        shapes = [
+            (state_size, hidden_size),
+            (hidden_size, hidden_size),
+            (hidden_size, action_size),
+        ]
+
+        # weights are views into `flat`, so a memory-mapped file stays mapped
+        self.params = []
+        offset = 3
+        for n_in, n_out in shapes:
+            weight = flat[offset:offset + n_in * n_out].reshape(n_in, n_out)
+            offset += n_in * n_out
+            bias = flat[offset:offset + n_out]
+            offset += n_out
+            self.params.append((weight, bias))
+
+        self.state_size = state_size
+        self.action_size = action_size
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    def q_values(self, states):
+        x = np.asarray(states, dtype=np.float32)
+        (w1, b1), (w2, b2), (w3, b3) = self.params
+        x = np.maximum(x @ w1 + b1, 0)
+        x = np.maximum(x @ w2 + b2, 0)
+        return x @ w3 + b3
+
+    def act(self, states):
+        """Greedy action for one state (returns int) or a batch (returns array)."""
+        q_values = self.q_values(states)
+        if q_values.ndim == 1:
+            return int(q_values.argmax())
+        return q_values.argmax(axis=1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m agent.numpy_policy CHECKPOINT.pth OUTPUT.npy")
+    export_checkpoint(sys.argv[1], sys.argv[2])
+    print(f"Exported {sys.argv[1]} -> {sys.argv[2]}")
@@ -0,0 +1,254 @@
+"""
+Asyncio policy server that micro-batches concurrent action requests.
+
+Protocol: newline-delimited JSON over TCP or a Unix socket.
+
+    {"state": [9 floats], "id": 7}      -> {"id": 7, "action": 4, "q_values": [...]}
+    {"cmd": "metrics"}                  -> queue depth, batch and latency stats
+    {"cmd": "reload", "path": "x.pth"}  -> hot-swap the checkpoint
+
+Run from the repository root:
+    python -m agent.policy_server --port 8765
+    python -m agent.policy_server --unix /tmp/policy.sock
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from agent.dqn_agent import QNetwork
+
+
+class PolicyServer:
+    def __init__(self, model_path, state_size=9, action_size=12,
+                 max_batch_size=256, max_wait_ms=2.0):
+        self.state_size = state_size
+        self.action_size = action_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self.network = self._load(model_path)
+        self.model_path = model_path
+
+        # one worker keeps forwards ordered and off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+
+        self.requests = 0
+        self.batches = 0
+        self.reloads = 0
+        self.latencies = deque(maxlen=10000)
+
+    def _load(self, path):
+        network = QNetwork(self.state_size, self.action_size)
+        network.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+        network.eval()
+        network.requires_grad_(False)
+        return network
+
+    def _forward(self, network, states):
+        with torch.inference_mode():
+            q_values = network(torch.from_numpy(states)).numpy()
+        return q_values.argmax(axis=1), q_values
+
+    # ------------------------------
+    # Batching
+    # ------------------------------
+    async def act(self, state):
+        state = np.asarray(state, dtype=np.float32)
+        # a malformed state must never reach the shared batch
+        if state.shape != (self.state_size,):
+            raise ValueError(f"state must have {self.state_size} values, got shape {state.shape}")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((state, future, time.perf_counter()))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                states = np.stack([item[0] for item in batch])
+                # the network reference is read once, so a concurrent reload
+                # only affects the next batch
+                actions, q_values = await loop.run_in_executor(
+                    self.executor, self._forward, self.network, states
+                )
+            except Exception as exc:
+                # fail this batch's requests, keep serving the next ones
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            done = time.perf_counter()
+            for (_, future, start), action, q in zip(batch, actions, q_values):
+                if not future.done():
+                    future.set_result((int(action), q.tolist()))
+                self.latencies.append(done - start)
+
+            self.requests += len(batch)
+            self.batches += 1
+
+    async def reload(self, path):
+        """Load a new checkpoint off the event loop, then swap it in."""
+        loop = asyncio.get_running_loop()
+        network = await loop.run_in_executor(None, self._load, path)
+        self.network = network
+        self.model_path = path
+        self.reloads += 1
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "latency_p50_ms": float(p50),
+            "latency_p99_ms": float(p99),
+            "model_path": self.model_path,
+            "reloads": self.reloads,
+        }
+
+    # ------------------------------
+    # Connections
+    # ------------------------------
+    async def _respond(self, message, writer, lock):
+        try:
+            if "cmd" in message:
+                if message["cmd"] == "metrics":
+                    response = self.metrics()
+                elif message["cmd"] == "reload":
+                    path = message["path"]
+                    try:
+                        await self.reload(path)
+                    except Exception as exc:  # unreadable, non-torch or mismatched checkpoint
+                        response = {"error": f"reload failed: {exc}"}
+                    else:
+                        response = {"reloaded": path}
+                else:
+                    response = {"error": f"unknown command {message['cmd']!r}"}
+            else:
+                action, q_values = await self.act(message["state"])
+                response = {"action": action, "q_values": q_values}
+        except KeyError as exc:
+            response = {"error": f"missing field {exc}"}
+        except (ValueError, TypeError, OSError, RuntimeError) as exc:
+            # malformed state
+            response = {"error": str(exc)}
+
+        if "id" in message:
+            response["id"] = message["id"]
+        await self._send(writer, lock, response)
+
+    @staticmethod
+    async def _send(writer, lock, response):
+        async with lock:
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+
+    @staticmethod
+    async def _read_line(reader):
+        """Next request line; None if it exceeded the stream limit (it is skipped)."""
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial  # EOF, possibly after a last line without newline
+        except asyncio.LimitOverrunError as exc:
+            overrun = exc
+
+        # drop the oversized line up to and including its newline
+        while True:
+            await reader.readexactly(overrun.consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.IncompleteReadError:
+                return b""
+            except asyncio.LimitOverrunError as exc:
+                overrun = exc
+
+    async def _handle(self, reader, writer):
+        # requests on one connection are answered as they finish, so clients
+        # may pipeline and match responses by "id". A bad line only gets an
+        # error response; it never closes the connection
+        lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await self._read_line(reader)
+                if line is None:
+                    await self._send(writer, lock, {"error": "request line too long"})
+                    continue
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)  # also raises on invalid UTF-8
+                except ValueError as exc:
+                    await self._send(writer, lock, {"error": str(exc)})
+                    continue
+                if not isinstance(message, dict):
+                    await self._send(writer, lock, {"error": "request must be a JSON object"})
+                    continue
+                task = asyncio.create_task(self._respond(message, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batch_loop())
+
+        if unix_path:
+            server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                batcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="dqn_traffic_model.pth")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="serve on a Unix socket path instead")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    server = PolicyServer(args.model, max_batch_size=args.max_batch_size,
+                          max_wait_ms=args.max_wait_ms)
+    asyncio.run(server.serve(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ import time
 import pandas as pd
 import altair as alt
 
+import simulation
+from simulation import LANES, SCENARIOS, simulate_scenario, trace_insight
+
 # ==========================================
 # 1. SESSION STATE
 # ==========================================
@@ -109,47 +112,38 @@ st.markdown(f"""
 # 3. TRAFFIC LOGIC CORE 
 
 
-class TrafficEnv:
-    def __init__(self):
-        self.lanes = ["North", "South", "East", "West"]
-        self.queues = np.random.randint(5, 15, 4).astype(float) 
-        self.current_green = 0
-        self.arrival_rates = [2, 2, 2, 2] 
-        self.clearance_rate = 4           
-
-    def step(self, action_idx, is_emergency=False):
-        arrivals = np.random.poisson(self.arrival_rates)
-        self.queues += arrivals
-        self.current_green = action_idx
-        clear_amount = self.clearance_rate * (2 if is_emergency else 1)
-        self.queues[action_idx] = max(0, self.queues[action_idx] - clear_amount)
-        return self.queues
-
-def get_ai_action(queues):
-    return np.argmax(queues)
-
-def generate_decision_insight(action_idx, queues, is_emergency, emergency_lane):
-    lanes = ["North", "South", "East", "West"]
-    selected_lane = lanes[action_idx]
-    current_q = queues[action_idx]
-    avg_q = np.mean(queues)
-    
-    if is_emergency:
-        return {
-            "title": "🚑 EMERGENCY PRIORITY",
-            "reason": "Decision overridden due to emergency priority.",
-            "data": f"Forcing Green: {lanes[emergency_lane]}",
-            "style": "insight-card-emergency",
-            "icon": "🚨"
-        }
-    
-    return {
-        "title": f"✅ AI DECISION: {selected_lane.upper()}",
-        "reason": "Highest queue imbalance detected.",
-        "data": f"Queue: {int(current_q)} vehicles | Average: {int(avg_q)}",
-        "style": "insight-card",
-        "icon": "🤖"
-    }
+SYSTEMS = ['Fixed System', 'AI System']
+FRAME_BUDGET = 1 / 20  # seconds; caps dashboard redraws at ~20 fps
+HISTORY_BUDGET = 1.0   # seconds between history chart refreshes during playback
+
+
+def history_frame(loads):
+    """Long-format history rows for the (2, steps) fixed/AI loads."""
+    n = loads.shape[1]
+    return pd.DataFrame({
+        'Step': np.tile(np.arange(n), 2),
+        'System': np.repeat(SYSTEMS, n),
+        'Total Load': loads.ravel()
+    })
+
+
+MODEL_PATH = "dqn_traffic_model.pth"
+
+
+# The trained QNetwork is loaded once per process and shared by all sessions
+@st.cache_resource(show_spinner="Loading DQN policy...")
+def load_policy(path):
+    return simulation.load_policy(path)
+
+
+# Simulations run headless once per (scenario, steps, seed) and are shared
+# by every session viewing the same parameters
+@st.cache_data(max_entries=32, show_spinner="Simulating scenario...")
+def load_trace(scenario, steps, seed, model_path):
+    return simulate_scenario(load_policy(model_path), scenario, steps, seed)
+
+
+load_policy(MODEL_PATH)  # preload on the first script run
 
 
 # 4. SIDEBAR CONTROLS
@@ -158,11 +152,12 @@ with st.sidebar:
     st.title("🎛️ Control Panel")
     st.markdown("---")
     
-    simulation_speed = st.slider("Simulation Speed", 0.1, 2.0, 0.5)
+    simulation_speed = st.slider("Simulation Speed (sec / step)", 0.01, 2.0, 0.5)
     total_steps = st.slider("Duration (Steps)", 50, 300, 100)
     
     st.markdown("### 🚦 Traffic Scenarios")
-    scenario = st.selectbox("Select Condition", ["Normal Flow", "Morning Rush", "Emergency Event"])
+    scenario = st.selectbox("Select Condition", SCENARIOS)
+    seed = st.number_input("Random Seed", min_value=0, value=0, step=1)
     
     st.markdown("---")
     
@@ -172,8 +167,11 @@ with st.sidebar:
         st.session_state.params = {
             'speed': simulation_speed,
             'steps': total_steps,
-            'scenario': scenario
+            'scenario': scenario,
+            'seed': int(seed)
         }
+        st.session_state.playhead = 0
+        st.session_state.playing = True
         st.rerun()
 
 
@@ -200,7 +198,7 @@ with c2:
     <div class="explanation-box">
         <strong style="color:{ACCENT_AI}">🔹 AI Traffic Logic</strong><br>
         <span style="font-size:0.85rem; color:{TEXT_SECONDARY}">
-        Adaptive logic that prioritizes the most congested lane using real-time data.
+        Trained DQN policy that picks the green lane and duration from live queues and wait times.
         "The AI reacts to real queues, not static schedules."
         </span>
     </div>
@@ -230,13 +228,25 @@ if st.session_state.sim_running:
     # Retrieve Params
     params = st.session_state.params
     
-    # Init Environments
-    env_fixed = TrafficEnv()
-    env_ai = TrafficEnv()
-    
-    if params['scenario'] == "Morning Rush":
-        env_fixed.arrival_rates = [6, 2, 6, 2]
-        env_ai.arrival_rates = [6, 2, 6, 2]
+    steps = params['steps']
+    trace = load_trace(params['scenario'], steps, params['seed'], MODEL_PATH)
+    queues, actions, loads = trace['queues'], trace['actions'], trace['loads']
+
+    # --- PLAYBACK CONTROLS ---
+    def pause_on_scrub():
+        st.session_state.playhead = st.session_state.scrub
+        st.session_state.playing = False
+
+    col_play, col_scrub = st.columns([1, 5])
+    playing = st.session_state.get('playing', True)
+    if col_play.button("⏸ Pause" if playing else "▶ Play", use_container_width=True):
+        if not playing and st.session_state.playhead >= steps - 1:
+            st.session_state.playhead = 0
+        st.session_state.playing = not playing
+        st.rerun()
+
+    st.session_state.scrub = min(st.session_state.get('playhead', 0), steps - 1)
+    col_scrub.slider("Playback Step", 0, steps - 1, key="scrub", on_change=pause_on_scrub)
     
     # UI Layout
     insight_panel = st.empty()
@@ -244,33 +254,34 @@ if st.session_state.sim_running:
     chart_fixed_spot = col_metrics_fixed.empty()
     chart_ai_spot = col_metrics_ai.empty()
     history_chart_spot = st.empty()
+    progress_spot = st.empty()
     summary_spot = st.empty()
     
-    history_fixed, history_ai = [], []
-    emergency_lane = 0 
-    
-    # --- LOOP ---
-    for t in range(params['steps']):
-        
-        is_emergency_active = (params['scenario'] == "Emergency Event" and 20 < t < 50)
-        
-        # LOGIC
-        action_fixed = (t // 5) % 4 
-        
-        if is_emergency_active:
-            action_ai = emergency_lane
-        else:
-            action_ai = get_ai_action(env_ai.queues)
-            
-        q_fixed = env_fixed.step(action_fixed)
-        q_ai = env_ai.step(action_ai, is_emergency_active)
-        
-        load_fixed = np.sum(q_fixed)
-        load_ai = np.sum(q_ai)
-        history_fixed.append(load_fixed)
-        history_ai.append(load_ai)
-        
-        insight = generate_decision_insight(action_ai, env_ai.queues, is_emergency_active, emergency_lane)
+    # Chart specs are built once; each frame only swaps in 4 bar rows. The
+    # history chart carries the whole trace and is masked at the playhead
+    def create_bar_chart(color):
+        return alt.Chart().mark_bar().encode(
+            x=alt.X('Lane:N', axis=None, sort=LANES),
+            y=alt.Y('Vehicles:Q', scale=alt.Scale(domain=[0, 50])),
+            color=alt.condition(
+                alt.datum.Status == 'Active', alt.value(color), alt.value("#374151")
+            ),
+            tooltip=['Lane', 'Vehicles']
+        ).properties(height=200)
+
+    def bar_frame(chart, queues, active_idx, title):
+        df = pd.DataFrame({
+            'Lane': LANES,
+            'Vehicles': queues,
+            'Status': ['Active' if i == active_idx else 'Red' for i in range(4)]
+        })
+        return chart.properties(data=df, title=title)
+
+    bar_fixed = create_bar_chart(ACCENT_FIXED)
+    bar_ai = create_bar_chart(ACCENT_AI)
+
+    def render_frame(t):
+        insight = trace_insight(trace, t)
         
         # RENDER INSIGHT
         with insight_panel:
@@ -290,53 +301,76 @@ if st.session_state.sim_running:
             """, unsafe_allow_html=True)
             
         # RENDER CHARTS
-        def create_bar_chart(queues, active_idx, color, title):
-            df = pd.DataFrame({
-                'Lane': ["North", "South", "East", "West"], 
-                'Vehicles': queues,
-                'Status': ['Active' if i == active_idx else 'Red' for i in range(4)]
-            })
-            return alt.Chart(df).mark_bar().encode(
-                x=alt.X('Lane', axis=None),
-                y=alt.Y('Vehicles', scale=alt.Scale(domain=[0, 40])),
-                color=alt.condition(
-                    alt.datum.Status == 'Active', alt.value(color), alt.value("#374151")
-                ),
-                tooltip=['Lane', 'Vehicles']
-            ).properties(height=200, title=title)
-
-        with chart_fixed_spot:
-            st.altair_chart(create_bar_chart(q_fixed, action_fixed, ACCENT_FIXED, f"Fixed Controller (Load: {int(load_fixed)})"), use_container_width=True)
-        with chart_ai_spot:
-            st.altair_chart(create_bar_chart(q_ai, action_ai, ACCENT_AI, f"AI Controller (Load: {int(load_ai)})"), use_container_width=True)
-
-        # RENDER HISTORY
-        df_hist = pd.DataFrame({'Step': range(len(history_fixed)), 'Fixed System': history_fixed, 'AI System': history_ai}).melt('Step', var_name='System', value_name='Total Load')
-        line_chart = alt.Chart(df_hist).mark_line(strokeWidth=3).encode(
-            x='Step', y='Total Load',
-            color=alt.Color('System', scale=alt.Scale(domain=['Fixed System', 'AI System'], range=[ACCENT_FIXED, ACCENT_AI]))
-        ).properties(height=250, title="Real-time Efficiency Comparison (Lower is Better)")
-        history_chart_spot.altair_chart(line_chart, use_container_width=True)
-        
-        time.sleep(params['speed'])
-    
+        chart_fixed_spot.altair_chart(bar_frame(bar_fixed, queues[0, t], actions[0, t] // 3, f"Fixed Controller (Load: {int(loads[0, t])})"), use_container_width=True)
+        chart_ai_spot.altair_chart(bar_frame(bar_ai, queues[1, t], actions[1, t] // 3, f"AI Controller (Load: {int(loads[1, t])})"), use_container_width=True)
+
+    line_chart = alt.Chart(history_frame(loads)).mark_line(strokeWidth=3).encode(
+        x=alt.X('Step:Q', scale=alt.Scale(domain=[0, steps - 1])), y='Total Load:Q',
+        color=alt.Color('System:N', scale=alt.Scale(domain=SYSTEMS, range=[ACCENT_FIXED, ACCENT_AI]))
+    ).properties(height=250, title="Efficiency Comparison (Lower is Better)")
+
+    def render_progress(t):
+        progress_spot.progress(t / max(steps - 1, 1), text=f"Step {t} / {steps - 1}")
+
+    # RENDER HISTORY: the same trace rows every time, filtered to the steps
+    # already played so the chart never shows future loads. It is re-sent
+    # only on pause and every HISTORY_BUDGET seconds of playback; a paused
+    # playhead is also marked on the chart
+    def render_history(t, paused):
+        history_chart = line_chart.transform_filter(alt.datum.Step <= t)
+        if paused:
+            playhead = alt.Chart(pd.DataFrame({'Step': [t]})).mark_rule(
+                color=TEXT_PRIMARY, strokeDash=[4, 4]
+            ).encode(x='Step:Q')
+            history_chart = alt.layer(history_chart, playhead)
+        history_chart_spot.altair_chart(history_chart, use_container_width=True)
+
+    start = st.session_state.playhead
+    render_frame(start)
+    render_progress(start)
+    render_history(start, paused=not st.session_state.playing)
+
+    # --- PLAYBACK LOOP ---
+    if st.session_state.playing:
+        # THROTTLE: at most one redraw per frame budget; faster speeds
+        # advance several steps per redraw instead of drawing every step
+        stride = max(1, int(np.ceil(FRAME_BUDGET / params['speed'])))
+        t = start
+        last_history = time.perf_counter()
+
+        while t < steps - 1:
+            advance = min(stride, steps - 1 - t)
+            time.sleep(params['speed'] * advance)
+            t += advance
+            st.session_state.playhead = t
+
+            render_frame(t)
+            render_progress(t)
+
+            now = time.perf_counter()
+            if now - last_history >= HISTORY_BUDGET or t == steps - 1:
+                render_history(t, paused=False)
+                last_history = now
+
+        st.session_state.playing = False
+
     # --- CONCLUSION ---
-    avg_load_fixed = np.mean(history_fixed)
-    avg_load_ai = np.mean(history_ai)
-    improvement = ((avg_load_fixed - avg_load_ai) / avg_load_fixed) * 100
-    
-    summary_spot.markdown(f"""
-    <div style="background-color: {BG_CARD}; padding: 25px; border-radius: 8px; margin-top: 20px; border: 1px solid {ACCENT_AI};">
-        <h3 style="color: {ACCENT_AI}; margin-top:0;">📊 Why the AI Model Is More Efficient</h3>
-        <p style="color: {TEXT_PRIMARY};">
-            Under identical traffic conditions, the <b>AI-based controller</b> consistently maintained a lower total vehicle load than the traditional fixed-time traffic system.
-        </p>
-        <p style="color: {TEXT_SECONDARY};">
-            This improvement is achieved by dynamically allocating green time based on congestion rather than following static schedules.
-            The AI controller reduced average congestion by <b>{improvement:.1f}%</b> compared to fixed-time logic.
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    if st.session_state.playhead >= steps - 1:
+        avg_load_fixed, avg_load_ai = loads.mean(axis=1)
+        improvement = ((avg_load_fixed - avg_load_ai) / avg_load_fixed) * 100
+
+        summary_spot.markdown(f"""
+        <div style="background-color: {BG_CARD}; padding: 25px; border-radius: 8px; margin-top: 20px; border: 1px solid {ACCENT_AI};">
+            <h3 style="color: {ACCENT_AI}; margin-top:0;">📊 Why the AI Model Is More Efficient</h3>
+            <p style="color: {TEXT_PRIMARY};">
+                Under identical traffic conditions, the <b>AI-based controller</b> consistently maintained a lower total vehicle load than the traditional fixed-time traffic system.
+            </p>
+            <p style="color: {TEXT_SECONDARY};">
+                This improvement is achieved by dynamically allocating green time based on congestion rather than following static schedules.
+                The AI controller reduced average congestion by <b>{improvement:.1f}%</b> compared to fixed-time logic.
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
 
 else:
     # LANDING STATE (When simulation is not running)
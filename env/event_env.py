@@ -0,0 +1,208 @@
+import heapq
+import math
+import random
+
+import numpy as np
+
+ARRIVAL = 0
+DEPARTURE = 1
+DRAW_BLOCK = 4096  # random variates drawn per vectorized RNG call
+
+
+class EventTrafficEnv:
+    """
+    Event-driven alternative to TrafficEnv with second-resolution timing.
+
+    Same reset()/step(action) interface, 12 actions and 9-value observation.
+    Instead of adding a step's arrivals in one go and clearing duration // 2
+    vehicles, each action runs one signal phase in continuous time:
+
+    - an amber/all-red interval when the green moves to another lane
+    - a green interval of 10/20/30 s with a start-up lost time, after which
+      queued vehicles discharge one saturation headway apart
+    - arrivals on every lane throughout, including during green
+
+    Vehicle arrivals and departures sit in one heap ordered by time, so a
+    phase costs O(events) no matter how long or quiet it is. Arrivals are a
+    non-homogeneous Poisson process (sampled by thinning) whose rate follows
+    the same sinusoidal peak pattern as TrafficEnv, scaled from vehicles per
+    step to vehicles per second.
+    """
+
+    def __init__(self, seed=None, headway=2.0, lost_time=2.0, amber_time=3.0,
+                 step_seconds=20.0):
+        self.num_lanes = 4
+        self.max_queue = 50
+        self.max_green_time = 30
+        self.arrival_rates = 2 + np.arange(self.num_lanes)  # vehicles per step, as TrafficEnv
+
+        self.headway = headway          # seconds between discharging vehicles
+        self.lost_time = lost_time      # start-up delay at the beginning of green
+        self.amber_time = amber_time    # inserted when the green lane changes
+        self.step_seconds = step_seconds  # mean phase length the rates are scaled by
+
+        self.rng = np.random if seed is None else np.random.default_rng(seed)
+
+        self.reset()
+
+    @property
+    def queues(self):
+        return np.array(self._queues)
+
+    def reset(self):
+        self._queues = [0] * self.num_lanes  # plain ints: cheap per-event updates
+        self.wait_times = np.zeros(self.num_lanes, dtype=float)
+
+        self.current_green = random.randint(0, self.num_lanes - 1)
+        self.green_time = 10
+
+        self.time_step = 0
+        self.clock = 0.0
+
+        self.events = []
+        self.seq = 0
+        self.green_lane = None      # None during amber
+        self.green_end = 0.0
+        self.next_discharge = 0.0
+        self.departure_pending = False
+        self.cleared = 0
+
+        self._queued = 0
+        self._draws = []
+        for lane in range(self.num_lanes):
+            self._schedule_arrival(lane, 0.0)
+
+        return self._get_state()
+
+    def _get_state(self):
+        return np.concatenate([
+            self.queues / self.max_queue,
+            self.wait_times / 100,
+            [self.current_green / (self.num_lanes - 1)]
+        ]).astype(np.float32)
+
+    def step(self, action):
+        """Run one signal phase (amber if switching, then green) for `action`."""
+        lane = action // 3
+        duration = (action % 3 + 1) * 10
+
+        previous_green = self.current_green
+        self.current_green = lane
+        self.green_time = duration
+        self.cleared = 0
+
+        if lane != previous_green:
+            self._advance(self.clock + self.amber_time)
+            self.next_discharge = self.clock + self.lost_time
+        else:
+            # green carries over: the stream keeps flowing without a new start-up
+            self.next_discharge = max(self.clock, self.next_discharge)
+
+        self.green_lane = lane
+        self.green_end = self.clock + duration
+        self._schedule_departure(self.clock)
+        self._advance(self.green_end)
+        self.green_lane = None
+
+        self._update_wait_times(lane)
+        reward = self._calculate_reward(self.cleared, previous_green, lane)
+
+        self.time_step += 1
+        done = self.time_step >= 500
+
+        return self._get_state(), reward, done
+
+    # -------------------------------
+    # EVENT QUEUE
+    # -------------------------------
+    def _push(self, time, kind, lane):
+        self.seq += 1
+        heapq.heappush(self.events, (time, self.seq, kind, lane))
+
+    def _advance(self, until):
+        """Process every event up to `until`, jumping straight between them."""
+        events = self.events
+        while events and events[0][0] <= until:
+            time, _, kind, lane = heapq.heappop(events)
+            self.clock = time
+
+            if kind == ARRIVAL:
+                self._arrive(time, lane)
+            else:
+                self._depart(time, lane)
+
+        self.clock = until
+
+    def _draw(self):
+        """(standard exponential, uniform) pair, refilled a block at a time."""
+        if not self._draws:
+            block = zip(
+                self.rng.standard_exponential(DRAW_BLOCK).tolist(),
+                self.rng.random(DRAW_BLOCK).tolist()
+            )
+            self._draws = list(block)[::-1]
+        return self._draws.pop()
+
+    def _schedule_arrival(self, lane, now):
+        # thinning: candidates at the peak rate, accepted with probability
+        # rate(t) / peak rate, where rate follows TrafficEnv's sinusoid
+        base_rate = float(self.arrival_rates[lane]) / self.step_seconds
+        period = 40 * self.step_seconds
+        time = now
+        while True:
+            gap, u = self._draw()
+            time += gap / (1.7 * base_rate)
+            if u * 1.7 <= 1.0 + 0.7 * math.sin(time / period):
+                break
+        self._push(time, ARRIVAL, lane)
+
+    def _arrive(self, time, lane):
+        self._schedule_arrival(lane, time)
+
+        if self._queues[lane] < self.max_queue:
+            self._queues[lane] += 1
+            self._queued += 1
+            if lane == self.green_lane:
+                self._schedule_departure(time)
+
+    def _schedule_departure(self, now):
+        lane = self.green_lane
+        if self.departure_pending or self._queues[lane] == 0:
+            return
+
+        time = max(now, self.next_discharge)
+        if time < self.green_end:
+            self._push(time, DEPARTURE, lane)
+            self.departure_pending = True
+
+    def _depart(self, time, lane):
+        self.departure_pending = False
+        self._queues[lane] -= 1
+        self._queued -= 1
+        self.cleared += 1
+        self.next_discharge = time + self.headway
+        self._schedule_departure(time)
+
+    # -------------------------------
+    # REWARD (same shape as TrafficEnv)
+    # -------------------------------
+    def _update_wait_times(self, green_lane):
+        for i in range(self.num_lanes):
+            if i != green_lane:
+                self.wait_times[i] += 1
+        self.wait_times[green_lane] = 0
+
+    def _calculate_reward(self, cleared, prev_lane, curr_lane):
+        wait_penalty = np.sum(self.wait_times)
+        congestion_penalty = self._queued
+
+        # discourage rapid switching
+        switch_penalty = 5 if prev_lane != curr_lane else 0
+
+        reward = (
+            cleared * 4
+            - wait_penalty * 1.0
+            - congestion_penalty * 0.3
+            - switch_penalty
+        )
+        return reward
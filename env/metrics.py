@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram (DDSketch style) for streaming quantiles.
+
+    Values land in buckets whose bounds grow by a factor gamma, so any
+    quantile is returned within `relative_accuracy` of the true value while
+    memory grows only with log(max / min). Sketches merge by adding counts.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value):
+        self.count += 1
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other):
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float("nan")
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # midpoint of (gamma^(k-1), gamma^k] in relative terms
+                return float(min(2 * self.gamma ** key / (self.gamma + 1), self.max))
+        return float(self.max)
+
+
+class TrafficMetrics:
+    """
+    O(1)-per-step KPI accumulators for one intersection. Totals persist
+    across episode resets until reset() is called on the tracker itself.
+
+    Delay integrates the queue over each phase's duration (trapezoid
+    between the queue at phase start and at phase end). Wait time is the
+    red time, in seconds, a lane accumulated before it was switched to green.
+    Lanes still red when an episode ends are counted with the red time they
+    had so far (censored), so a starved lane shows up in the percentiles.
+    """
+
+    def __init__(self, num_lanes=4, max_queue=50, relative_accuracy=0.01):
+        self.num_lanes = num_lanes
+        self.max_queue = max_queue
+        self.relative_accuracy = relative_accuracy
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.episodes = 0
+        self.seconds = 0
+        self.arrived = 0
+        self.dropped = 0
+        self.served = 0
+        self.congestion_area = 0
+        self.delay_vehicle_seconds = 0.0
+        # plain Python lists: per-step updates stay a handful of int ops
+        self.max_queue_seen = [0] * self.num_lanes
+        self.queue_histogram = [[0] * (self.max_queue + 1) for _ in range(self.num_lanes)]
+        self.wait_sketch = QuantileSketch(self.relative_accuracy)
+        self.clock = 0
+        self.red_since = [0] * self.num_lanes
+        self.green = None
+
+    def start_episode(self):
+        """Called by the env on reset: close open red intervals, restart the clock."""
+        for wait in self._open_waits():
+            self.wait_sketch.add(wait)
+        self.clock = 0
+        self.red_since = [0] * self.num_lanes
+        self.green = None
+
+    def _open_waits(self):
+        """Red time so far of every lane still waiting for green this episode."""
+        if self.clock == 0:
+            return []
+        return [self.clock - since for i, since in enumerate(self.red_since) if i != self.green]
+
+    def record(self, queues, queued_before, offered, cleared, lane, switched, duration):
+        queues = queues.tolist()
+        queued = sum(queues)
+        admitted = queued - queued_before + cleared  # arrivals that found room
+
+        if self.clock == 0:
+            self.episodes += 1
+        if switched:
+            self.wait_sketch.add(self.clock - self.red_since[lane])
+        self.clock += duration
+        # the green lane turns red again when this phase ends
+        self.red_since[lane] = self.clock
+        self.green = lane
+
+        self.steps += 1
+        self.seconds += duration
+        self.arrived += offered
+        self.dropped += offered - admitted
+        self.served += cleared
+        self.congestion_area += queued
+        self.delay_vehicle_seconds += 0.5 * (queued_before + queued) * duration
+
+        for i, q in enumerate(queues):
+            self.queue_histogram[i][q] += 1
+            if q > self.max_queue_seen[i]:
+                self.max_queue_seen[i] = q
+
+    def snapshot(self):
+        hours = self.seconds / 3600
+
+        # include the current episode's open red intervals without closing them
+        waits = self.wait_sketch
+        open_waits = self._open_waits()
+        if open_waits:
+            waits = QuantileSketch(self.relative_accuracy)
+            waits.merge(self.wait_sketch)
+            for wait in open_waits:
+                waits.add(wait)
+
+        return {
+            "steps": self.steps,
+            "episodes": self.episodes,
+            "simulated_seconds": self.seconds,
+            "vehicles_arrived": self.arrived,
+            "vehicles_served": self.served,
+            "vehicles_dropped": self.dropped,
+            "throughput_per_hour": self.served / hours if hours else 0.0,
+            "congestion_area": self.congestion_area,
+            "mean_queue": self.congestion_area / self.steps if self.steps else 0.0,
+            "delay_vehicle_seconds": self.delay_vehicle_seconds,
+            "mean_delay_per_vehicle": (
+                self.delay_vehicle_seconds / self.served if self.served else 0.0
+            ),
+            "max_queue": list(self.max_queue_seen),
+            "queue_histogram": np.array(self.queue_histogram, dtype=np.int64),
+            "wait_p50_seconds": waits.quantile(0.5),
+            "wait_p90_seconds": waits.quantile(0.9),
+            "wait_p99_seconds": waits.quantile(0.99),
+            "wait_max_seconds": waits.max,
+        }
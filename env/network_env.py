@@ -0,0 +1,205 @@
+import numpy as np
+
+
+# Lane index doubles as travel direction: a vehicle queued on the North
+# approach (lane 0) is heading south, and arrives on the North approach of
+# the junction below it.
+#   lane:    0 North  1 South  2 East   3 West
+#   heading: south    north    west     east
+HEADING_DELTA = np.array([[1, 0], [-1, 0], [0, -1], [0, 1]])
+RIGHT_TURN = np.array([2, 3, 1, 0])
+LEFT_TURN = np.array([3, 2, 0, 1])
+
+
+class NetworkTrafficEnv:
+    """
+    Road network of TrafficEnv junctions connected by directed links.
+
+    Every junction keeps 4 approach queues and the same 12-action interface
+    and 9-value observation as TrafficEnv. Vehicles discharged by a green
+    approach are split over its downstream links by turning ratio and added
+    to the downstream queues with a single scatter-add; the share not routed
+    to a link leaves the network.
+
+    Links are stored in CSR form over lane ids (junction * 4 + lane):
+    indptr[i]:indptr[i + 1] are the outgoing links of lane i, indices holds
+    the downstream lane ids and ratios the turning ratios.
+    """
+
+    def __init__(self, num_nodes, indptr, indices, ratios, external_rates, seed=None):
+        self.num_nodes = num_nodes
+        self.num_lanes = 4
+        self.max_queue = 50
+        self.max_green_time = 30
+        self.episode_length = 500
+
+        self.rng = np.random.default_rng(seed)
+
+        num_lane_ids = num_nodes * self.num_lanes
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.ratios = np.asarray(ratios, dtype=float)
+        self.external_rates = np.asarray(external_rates, dtype=float).reshape(
+            num_nodes, self.num_lanes
+        )
+
+        if len(self.indptr) != num_lane_ids + 1:
+            raise ValueError("indptr must have num_nodes * 4 + 1 entries")
+        row_sums = np.add.reduceat(
+            np.append(self.ratios, 0.0), self.indptr[:-1]
+        ) * (np.diff(self.indptr) > 0)
+        if np.any(row_sums > 1.0 + 1e-9):
+            raise ValueError("turning ratios of a lane must sum to at most 1")
+
+        # Precompute an exact multinomial split as a chain of conditional
+        # binomials: the k-th link of every lane is drawn in one vectorized call.
+        degree = np.diff(self.indptr)
+        self.edge_src = np.repeat(np.arange(num_lane_ids), degree)
+        rank = np.arange(len(self.indices)) - self.indptr[self.edge_src]
+
+        prev_mass = np.cumsum(self.ratios) - self.ratios
+        prev_mass -= np.repeat(prev_mass[self.indptr[:-1][degree > 0]], degree[degree > 0])
+        remaining_mass = np.maximum(1.0 - prev_mass, 1e-12)
+        self.cond_prob = np.clip(self.ratios / remaining_mass, 0.0, 1.0)
+
+        max_degree = int(degree.max()) if len(degree) else 0
+        self.rank_edges = [np.flatnonzero(rank == k) for k in range(max_degree)]
+
+        self.state_size = 2 * self.num_lanes + 1
+        self._rows = np.arange(num_nodes)
+
+        self.reset()
+
+    @classmethod
+    def grid(cls, rows, cols, turn_ratios=(0.6, 0.2, 0.2), seed=None):
+        """
+        rows x cols Manhattan grid. turn_ratios are (straight, right, left);
+        approaches fed from outside the grid get TrafficEnv's external
+        demand of 2 + lane vehicles per step, interior approaches only get
+        upstream flow.
+        """
+
+        straight, right, left = turn_ratios
+        num_nodes = rows * cols
+        r, c = np.divmod(np.arange(num_nodes), cols)
+
+        src, dst, ratio = [], [], []
+        for lane in range(4):
+            for heading, share in ((lane, straight),
+                                   (RIGHT_TURN[lane], right),
+                                   (LEFT_TURN[lane], left)):
+                nr = r + HEADING_DELTA[heading, 0]
+                nc = c + HEADING_DELTA[heading, 1]
+                inside = (nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)
+                nodes = np.flatnonzero(inside)
+                src.append(nodes * 4 + lane)
+                dst.append((nr[inside] * cols + nc[inside]) * 4 + heading)
+                ratio.append(np.full(len(nodes), share))
+
+        src = np.concatenate(src)
+        dst = np.concatenate(dst)
+        ratio = np.concatenate(ratio)
+
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(num_nodes * 4 + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes * 4), out=indptr[1:])
+
+        # A lane is a boundary entry if no link feeds it
+        fed = np.bincount(dst, minlength=num_nodes * 4) > 0
+        external_rates = np.where(fed, 0.0, np.tile(2.0 + np.arange(4), num_nodes))
+
+        return cls(num_nodes, indptr, dst[order], ratio[order], external_rates, seed=seed)
+
+    def reset(self):
+        self.queues = np.zeros((self.num_nodes, self.num_lanes), dtype=int)
+        self.wait_times = np.zeros((self.num_nodes, self.num_lanes), dtype=float)
+
+        self.current_green = self.rng.integers(0, self.num_lanes, size=self.num_nodes)
+        self.green_time = np.full(self.num_nodes, 10)
+
+        self.time_step = 0
+        return self._get_state()
+
+    def _get_state(self):
+        n = self.num_lanes
+        state = np.empty((self.num_nodes, self.state_size), dtype=np.float32)
+        np.divide(self.queues, self.max_queue, out=state[:, :n], casting="unsafe")
+        np.divide(self.wait_times, 100, out=state[:, n:2 * n], casting="unsafe")
+        np.divide(self.current_green, n - 1, out=state[:, 2 * n], casting="unsafe")
+        return state
+
+    def _sample_flows(self, discharged):
+        """Vehicles sent down each CSR edge, from discharged counts per lane id."""
+        remaining = discharged.copy()
+        flows = np.zeros(len(self.indices), dtype=np.int64)
+        for edges in self.rank_edges:
+            src = self.edge_src[edges]
+            flows[edges] = self.rng.binomial(remaining[src], self.cond_prob[edges])
+            remaining[src] -= flows[edges]
+        return flows
+
+    def _route(self, discharged):
+        """Split discharged vehicles (per lane id) over the outgoing links."""
+        flows = self._sample_flows(discharged)
+        inflow = np.bincount(
+            self.indices, weights=flows, minlength=self.num_nodes * self.num_lanes
+        )
+        return inflow.astype(int).reshape(self.num_nodes, self.num_lanes)
+
+    def step(self, actions):
+        """
+        actions: int array of shape (num_nodes,), 12-action TrafficEnv space.
+        Returns (states, rewards, done) with shapes (num_nodes, 9),
+        (num_nodes,) and a single bool for the shared episode clock.
+        """
+
+        inflow = self._discharge(actions)
+        return self._settle(inflow)
+
+    # Step is split in two so a sharded network (env/sharded_env.py) can
+    # exchange flows on cut links between routing and settling queues.
+    def _discharge(self, actions):
+        """Arrivals, green clearance and routing; returns the routed inflow."""
+        actions = np.asarray(actions, dtype=int)
+        lanes = actions // 3
+        durations = (actions % 3 + 1) * 10
+
+        self._switched = self.current_green != lanes
+        self.current_green = lanes
+        self.green_time = durations
+
+        # External demand at the network boundary
+        peak_factor = 1.0 + 0.7 * np.sin(self.time_step / 40)
+        arrivals = self.rng.poisson(self.external_rates * peak_factor)
+        np.minimum(self.queues + arrivals, self.max_queue, out=self.queues)
+
+        # Clear green approaches
+        rows = self._rows
+        self._cleared = np.minimum(self.queues[rows, lanes], durations // 2)
+        self.queues[rows, lanes] -= self._cleared
+
+        # Propagate discharged vehicles downstream
+        discharged = np.zeros(self.num_nodes * self.num_lanes, dtype=np.int64)
+        discharged[rows * self.num_lanes + lanes] = self._cleared
+        return self._route(discharged)
+
+    def _settle(self, inflow):
+        """Add routed inflow, update waits and compute per-junction rewards."""
+        # overflow beyond max_queue is dropped, as in TrafficEnv
+        np.minimum(self.queues + inflow, self.max_queue, out=self.queues)
+
+        rows = self._rows
+        self.wait_times += 1
+        self.wait_times[rows, self.current_green] = 0
+
+        rewards = (
+            self._cleared * 4
+            - self.wait_times.sum(axis=1) * 1.0
+            - self.queues.sum(axis=1) * 0.3
+            - self._switched * 5
+        )
+
+        self.time_step += 1
+        done = self.time_step >= self.episode_length
+
+        return self._get_state(), rewards, done
@@ -0,0 +1,494 @@
+"""
+Sharded multi-process NetworkTrafficEnv.
+
+The junctions of a road network are partitioned into shards, one worker
+process each. Every tick a shard runs arrivals, clearance and routing for
+its own junctions, swaps the vehicles routed over cut links (links whose
+downstream junction lives in another shard) with its neighbours, then
+settles queues and rewards. Only cut-link flows cross shard boundaries.
+
+Two transports for the boundary exchange:
+    shm     one shared flow array per parity, synchronised by a barrier
+    socket  a multiprocessing.connection per neighbouring shard pair
+            (TCP, so shards may run on other hosts)
+
+With the socket transport, remote_shards of the shards are not spawned
+locally but attached by shard workers started on other hosts. Every shard
+listens on `bind` and advertises `advertise` (default: the hostname when
+bound to all interfaces) to its peers. All hosts need this repository and
+the same authkey.
+
+multiprocessing.connection unpickles whatever it receives, so anyone who
+knows the authkey can run code on every shard host. A fixed default key is
+only used on loopback; binding any other interface needs an explicit key
+(authkey=..., --authkey or $TRAFFIC_SHARDS_AUTHKEY), and the ports should
+still only be reachable from the cluster.
+
+The coordinator keeps the NetworkTrafficEnv interface: step(actions) takes
+one 12-way action per junction and returns (num_nodes, 9) observations,
+so a DQNAgent / NumpyPolicy drives it unchanged.
+
+Run from the repository root:
+    python -m env.sharded_env --rows 32 --cols 32 --shards 4 --transport shm
+
+Two shards on this host (node1) and two on node2, sharing a secret key:
+    $ export TRAFFIC_SHARDS_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    (set the same value on node2)
+    node1$ python -m env.sharded_env --shards 4 --transport socket \
+               --bind 0.0.0.0 --advertise node1 --port 7100 --remote-shards 2
+    node2$ python -m env.sharded_env --worker node1:7100 --bind 0.0.0.0 --advertise node2
+    node2$ python -m env.sharded_env --worker node1:7100 --bind 0.0.0.0 --advertise node2
+"""
+import argparse
+import multiprocessing as mp
+import os
+import socket
+import time
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from env.network_env import NetworkTrafficEnv
+
+LOOPBACK_AUTHKEY = b"traffic-shards"  # public; only accepted on loopback binds
+AUTHKEY_ENV = "TRAFFIC_SHARDS_AUTHKEY"
+
+
+# ------------------------------
+# Partitioning
+# ------------------------------
+def build_shards(num_nodes, indptr, indices, ratios, external_rates, partition):
+    """
+    Split a global CSR network into per-shard CSR networks.
+
+    Links to junctions of another shard point at "ghost" lane ids past the
+    shard's own lanes; cut[k] describes global cut link k as
+    (source shard, destination shard, destination local lane id).
+    """
+    num_shards = int(partition.max()) + 1
+    lanes = 4
+    external_rates = np.asarray(external_rates, dtype=float).reshape(num_nodes, lanes)
+
+    nodes_of = [np.flatnonzero(partition == s) for s in range(num_shards)]
+    local_index = np.empty(num_nodes, dtype=np.int64)
+    for nodes in nodes_of:
+        local_index[nodes] = np.arange(len(nodes))
+
+    shards, cut = [], []
+    for s, nodes in enumerate(nodes_of):
+        lane_ids = (nodes[:, None] * lanes + np.arange(lanes)).ravel()
+        starts, ends = indptr[lane_ids], indptr[lane_ids + 1]
+
+        local_indptr = np.zeros(len(lane_ids) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=local_indptr[1:])
+        edges = np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)]).astype(np.int64) \
+            if len(lane_ids) else np.empty(0, dtype=np.int64)
+
+        dst = indices[edges]
+        dst_node = dst // lanes
+        is_cut = partition[dst_node] != s
+
+        local_dst = local_index[dst_node] * lanes + dst % lanes
+        ghost = len(lane_ids) + np.arange(is_cut.sum())
+        local_indices = np.where(is_cut, 0, local_dst)
+        local_indices[is_cut] = ghost
+
+        first_cut = len(cut)
+        cut.extend(zip(
+            [s] * int(is_cut.sum()),
+            partition[dst_node[is_cut]].tolist(),
+            local_dst[is_cut].tolist()
+        ))
+
+        shards.append({
+            "nodes": nodes,
+            "indptr": local_indptr,
+            "indices": local_indices,
+            "ratios": ratios[edges],
+            "external_rates": external_rates[nodes],
+            "cut_range": (first_cut, len(cut)),
+        })
+
+    return shards, np.array(cut, dtype=np.int64).reshape(-1, 3)
+
+
+class _Shard(NetworkTrafficEnv):
+    """NetworkTrafficEnv over a shard's junctions; ghost lanes collect cut-link flows."""
+
+    def __init__(self, nodes, indptr, indices, ratios, external_rates, num_cut, seed):
+        self.num_cut = num_cut
+        self.outflow = np.zeros(num_cut, dtype=np.int64)
+        super().__init__(len(nodes), indptr, indices, ratios, external_rates, seed=seed)
+
+    def _route(self, discharged):
+        flows = self._sample_flows(discharged)
+        local_lanes = self.num_nodes * self.num_lanes
+        inflow = np.bincount(self.indices, weights=flows, minlength=local_lanes + self.num_cut)
+        self.outflow = inflow[local_lanes:].astype(np.int64)
+        return inflow[:local_lanes].astype(int).reshape(self.num_nodes, self.num_lanes)
+
+
+# ------------------------------
+# Boundary Exchange
+# ------------------------------
+class SharedMemoryExchange:
+    """Cut-link flows in two shared arrays (alternating per tick) plus a barrier."""
+
+    def __init__(self, ctx, num_cut, num_shards):
+        self.buffers = [ctx.Array("q", max(num_cut, 1), lock=False) for _ in range(2)]
+        self.barrier = ctx.Barrier(num_shards)
+
+    def connect(self, shard_id, cut):
+        self.views = [np.frombuffer(b, dtype=np.int64) for b in self.buffers]
+        self.start, self.stop = _cut_range(cut, shard_id)
+        self.incoming = np.flatnonzero(cut[:, 1] == shard_id)
+        self.tick = 0
+
+    def exchange(self, outflow, local_lanes, dst_lanes):
+        view = self.views[self.tick & 1]
+        view[self.start:self.stop] = outflow
+        # double buffering: a shard can only overwrite this buffer again two
+        # ticks later, after every shard has passed the next barrier
+        self.barrier.wait()
+        self.tick += 1
+        return np.bincount(dst_lanes, weights=view[self.incoming], minlength=local_lanes)
+
+
+class SocketExchange:
+    """One duplex connection per neighbouring shard pair; flows sent as raw int64 bytes."""
+
+    def __init__(self, bind="127.0.0.1", advertise=None, authkey=None):
+        self.bind = bind
+        self.advertise = _advertised(bind, advertise)
+        self.authkey = resolve_authkey(authkey, bind)
+
+    def listen(self):
+        self.listener = Listener((self.bind, 0), authkey=self.authkey)
+        return self.advertise, self.listener.address[1]
+
+    def connect(self, shard_id, cut, addresses):
+        start, stop = _cut_range(cut, shard_id)
+        outgoing_dst = cut[start:stop, 1]
+        neighbours = sorted(set(outgoing_dst.tolist()) | set(cut[cut[:, 1] == shard_id, 0].tolist()))
+
+        # lower id accepts, higher id connects: no ordering deadlock
+        self.conns = {}
+        for peer in neighbours:
+            if peer < shard_id:
+                conn = Client(tuple(addresses[peer]), authkey=self.authkey)
+                conn.send(shard_id)
+                self.conns[peer] = conn
+        for _ in [p for p in neighbours if p > shard_id]:
+            conn = self.listener.accept()
+            self.conns[conn.recv()] = conn
+        self.listener.close()
+
+        self.send_slices = {p: np.flatnonzero(outgoing_dst == p) for p in neighbours}
+        self.recv_cuts = {p: np.flatnonzero((cut[:, 0] == p) & (cut[:, 1] == shard_id))
+                          for p in neighbours}
+
+    def exchange(self, outflow, local_lanes, dst_lanes_of):
+        for peer, conn in self.conns.items():
+            conn.send_bytes(outflow[self.send_slices[peer]].tobytes())
+        inflow = np.zeros(local_lanes)
+        for peer, conn in self.conns.items():
+            flows = np.frombuffer(conn.recv_bytes(), dtype=np.int64)
+            inflow += np.bincount(dst_lanes_of[peer], weights=flows, minlength=local_lanes)
+        return inflow
+
+
+def resolve_authkey(authkey, bind):
+    """
+    authkey, else $TRAFFIC_SHARDS_AUTHKEY, else the public loopback key.
+    Raises ValueError rather than use the public key on a non-loopback bind.
+    """
+    if authkey is None and os.environ.get(AUTHKEY_ENV):
+        authkey = os.environ[AUTHKEY_ENV].encode()
+    if authkey is None or authkey == LOOPBACK_AUTHKEY:
+        if not _is_loopback(bind):
+            raise ValueError(
+                f"binding {bind!r} exposes the shard sockets, which unpickle what they "
+                f"receive; pass a secret authkey or set {AUTHKEY_ENV}"
+            )
+        authkey = LOOPBACK_AUTHKEY
+    return authkey
+
+
+def _is_loopback(bind):
+    return bind in ("localhost", "::1") or bind.startswith("127.")
+
+
+def _advertised(bind, advertise):
+    """Address peers should dial: a wildcard bind is advertised by hostname."""
+    if advertise:
+        return advertise
+    if bind in ("", "0.0.0.0", "::"):
+        return socket.gethostname()
+    return bind
+
+
+def _cut_range(cut, shard_id):
+    rows = np.flatnonzero(cut[:, 0] == shard_id)
+    return (int(rows[0]), int(rows[-1]) + 1) if len(rows) else (0, 0)
+
+
+# ------------------------------
+# Shard Worker
+# ------------------------------
+def _run_shard(shard_id, spec, cut, exchange, conn, seed):
+    if hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[shard_id % len(cores)]})
+
+    start, stop = spec["cut_range"]
+    env = _Shard(spec["nodes"], spec["indptr"], spec["indices"], spec["ratios"],
+                 spec["external_rates"], stop - start, seed)
+    local_lanes = env.num_nodes * env.num_lanes
+
+    if isinstance(exchange, SocketExchange):
+        conn.send(exchange.listen())
+        exchange.connect(shard_id, cut, conn.recv())
+        dst_lanes = {p: cut[rows, 2] for p, rows in exchange.recv_cuts.items()}
+    else:
+        exchange.connect(shard_id, cut)
+        dst_lanes = cut[exchange.incoming, 2]
+    conn.send("ready")
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        command, actions = message
+        if command == "reset":
+            conn.send(env.reset())
+            continue
+
+        t0 = time.perf_counter()
+        inflow = env._discharge(actions)
+        t1 = time.perf_counter()
+        inflow = inflow + exchange.exchange(env.outflow, local_lanes, dst_lanes).astype(int).reshape(
+            env.num_nodes, env.num_lanes
+        )
+        t2 = time.perf_counter()
+        states, rewards, done = env._settle(inflow)
+        t3 = time.perf_counter()
+        conn.send((states, rewards, done, (t1 - t0) + (t3 - t2), t2 - t1))
+
+
+def run_worker(coordinator, bind="127.0.0.1", advertise=None, authkey=None):
+    """Attach to a coordinator (host, port), possibly on another host, and run one shard."""
+    authkey = resolve_authkey(authkey, bind)
+    conn = Client(tuple(coordinator), authkey=authkey)
+    try:
+        shard_id, spec, cut, seed = conn.recv()
+        _run_shard(shard_id, spec, cut, SocketExchange(bind, advertise, authkey), conn, seed)
+    finally:
+        conn.close()
+
+
+# ------------------------------
+# Coordinator
+# ------------------------------
+class ShardedNetworkEnv:
+    """
+    Same reset()/step() interface as NetworkTrafficEnv, with the junctions
+    stepped by num_shards worker processes. partition maps every junction
+    to a shard; by default junctions are split into contiguous id blocks
+    (row stripes for NetworkTrafficEnv.grid).
+
+    With transport="socket", the last remote_shards shards are run by
+    run_worker() processes that attach to the coordinator listening on
+    (bind, port); the constructor blocks until all of them have attached.
+    Results depend only on the seed, not on where the shards run.
+    """
+
+    def __init__(self, num_nodes, indptr, indices, ratios, external_rates,
+                 num_shards, partition=None, transport="shm", seed=None,
+                 bind="127.0.0.1", advertise=None, port=0, remote_shards=0,
+                 authkey=None, log=print):
+        self.num_nodes = num_nodes
+        self.num_lanes = 4
+        self.state_size = 2 * self.num_lanes + 1
+
+        if partition is None:
+            partition = np.repeat(np.arange(num_shards),
+                                  [len(b) for b in np.array_split(np.arange(num_nodes), num_shards)])
+        partition = np.asarray(partition, dtype=np.int64)
+        shards, cut = build_shards(
+            num_nodes, np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+            np.asarray(ratios, dtype=float), external_rates, partition
+        )
+        self.nodes = [shard["nodes"] for shard in shards]
+        self.num_cut_links = len(cut)
+
+        ctx = mp.get_context("spawn")
+        if transport == "shm":
+            exchange = SharedMemoryExchange(ctx, len(cut), num_shards)
+        elif transport == "socket":
+            authkey = resolve_authkey(authkey, bind)
+            exchange = SocketExchange(bind, advertise, authkey)
+        else:
+            raise ValueError("transport must be 'shm' or 'socket'")
+        if remote_shards and transport != "socket":
+            raise ValueError("remote shards need transport='socket'")
+        if not 0 <= remote_shards <= num_shards:
+            raise ValueError("remote_shards must be between 0 and num_shards")
+
+        seeds = np.random.SeedSequence(seed).spawn(num_shards)
+        num_local = num_shards - remote_shards
+        self.conns, self.workers = [], []
+        for shard_id, spec in enumerate(shards[:num_local]):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(
+                target=_run_shard,
+                args=(shard_id, spec, cut, exchange, child, seeds[shard_id]),
+                daemon=True
+            )
+            process.start()
+            self.conns.append(parent)
+            self.workers.append(process)
+
+        if remote_shards:
+            listener = Listener((bind, port), authkey=authkey)
+            self.address = (_advertised(bind, advertise), listener.address[1])
+            log(f"Waiting for {remote_shards} shard worker(s): "
+                f"python -m env.sharded_env --worker {self.address[0]}:{self.address[1]}")
+            with listener:
+                for shard_id in range(num_local, num_shards):
+                    conn = listener.accept()
+                    conn.send((shard_id, shards[shard_id], cut, seeds[shard_id]))
+                    self.conns.append(conn)
+
+        if transport == "socket":
+            addresses = [conn.recv() for conn in self.conns]
+            for conn in self.conns:
+                conn.send(addresses)
+        for conn in self.conns:
+            conn.recv()  # "ready"
+
+        self.compute_seconds = np.zeros(num_shards)
+        self.exchange_seconds = np.zeros(num_shards)
+        self.steps = 0
+
+    @classmethod
+    def grid(cls, rows, cols, num_shards, turn_ratios=(0.6, 0.2, 0.2), **kwargs):
+        network = NetworkTrafficEnv.grid(rows, cols, turn_ratios)
+        return cls(network.num_nodes, network.indptr, network.indices, network.ratios,
+                   network.external_rates, num_shards, **kwargs)
+
+    def reset(self):
+        for conn in self.conns:
+            conn.send(("reset", None))
+        states = np.empty((self.num_nodes, self.state_size), dtype=np.float32)
+        for nodes, conn in zip(self.nodes, self.conns):
+            states[nodes] = conn.recv()
+        return states
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=int)
+        for nodes, conn in zip(self.nodes, self.conns):
+            conn.send(("step", actions[nodes]))
+
+        states = np.empty((self.num_nodes, self.state_size), dtype=np.float32)
+        rewards = np.empty(self.num_nodes)
+        for i, (nodes, conn) in enumerate(zip(self.nodes, self.conns)):
+            states[nodes], rewards[nodes], done, compute, exchange = conn.recv()
+            self.compute_seconds[i] += compute
+            self.exchange_seconds[i] += exchange
+        self.steps += 1
+        return states, rewards, done
+
+    def stats(self):
+        """Per-shard mean compute / exchange time per tick and load imbalance."""
+        steps = max(self.steps, 1)
+        compute = self.compute_seconds / steps
+        return {
+            "junctions": [len(nodes) for nodes in self.nodes],
+            "compute_ms": (compute * 1e3).round(3).tolist(),
+            "exchange_ms": (self.exchange_seconds / steps * 1e3).round(3).tolist(),
+            # slowest shard vs the average: 1.0 is perfectly balanced
+            "imbalance": float(compute.max() / max(compute.mean(), 1e-12)),
+            "cut_links": self.num_cut_links,
+        }
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(None)
+        for conn in self.conns[len(self.workers):]:
+            conn.close()  # remote workers exit on None
+        for process in self.workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=32)
+    parser.add_argument("--cols", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--transport", choices=["shm", "socket"], default="shm")
+    parser.add_argument("--bind", default="127.0.0.1",
+                        help="interface shards (and the coordinator) listen on, for socket")
+    parser.add_argument("--advertise", default=None,
+                        help="address peers dial to reach this host (default: --bind, "
+                             "or the hostname when bound to all interfaces)")
+    parser.add_argument("--port", type=int, default=0,
+                        help="coordinator port remote shard workers attach to")
+    parser.add_argument("--remote-shards", type=int, default=0,
+                        help="shards run by --worker processes on other hosts (socket only)")
+    parser.add_argument("--worker", default=None, metavar="HOST:PORT",
+                        help="run one shard for the coordinator at HOST:PORT and exit")
+    parser.add_argument("--authkey", default=None,
+                        help=f"shared secret for all shard connections; required unless "
+                             f"binding loopback (prefer ${AUTHKEY_ENV}, which is not in ps)")
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--numpy-model", default=None,
+                        help="drive every junction with exported .npy weights (default: random)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    authkey = args.authkey.encode() if args.authkey else None
+    if args.worker or args.transport == "socket":
+        try:
+            authkey = resolve_authkey(authkey, args.bind)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.worker:
+        host, _, port = args.worker.rpartition(":")
+        run_worker((host, int(port)), args.bind, args.advertise, authkey)
+        return
+    if args.remote_shards and args.transport != "socket":
+        parser.error("--remote-shards needs --transport socket")
+
+    policy = None
+    if args.numpy_model:
+        from agent.numpy_policy import NumpyPolicy
+
+        policy = NumpyPolicy.load(args.numpy_model)
+    rng = np.random.default_rng(args.seed)
+
+    env = ShardedNetworkEnv.grid(args.rows, args.cols, args.shards, transport=args.transport,
+                                 seed=args.seed, bind=args.bind, advertise=args.advertise,
+                                 port=args.port, remote_shards=args.remote_shards,
+                                 authkey=authkey)
+    try:
+        states = env.reset()
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            actions = policy.act(states) if policy else rng.integers(0, 12, env.num_nodes)
+            states, _, _ = env.step(actions)
+        elapsed = time.perf_counter() - start
+    finally:
+        env.close()
+
+    print(
+        f"{args.rows}x{args.cols} grid | {args.shards} shards ({args.transport}) | "
+        f"{args.steps / elapsed:.1f} ticks/s | "
+        f"{args.steps * env.num_nodes / elapsed:.0f} junction-steps/s"
+    )
+    print("Per-shard:", env.stats())
+
+
+if __name__ == "__main__":
+    main()
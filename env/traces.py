@@ -0,0 +1,87 @@
+"""
+Pre-generated arrival traces (common random numbers).
+
+A trace is a uint8 array of shape (episodes, steps, 4): the vehicles that
+arrive on each lane at each step. Environments built with trace=... replay
+it instead of drawing from an RNG, so every policy evaluated on the same
+trace faces exactly the same demand and paired comparisons need far fewer
+episodes.
+
+Traces are plain .npy files (memory-mapped on load) with a .json sidecar
+describing how they were generated. Build one from the repository root:
+    python -m env.traces traces/peak.npy --episodes 1000 --seed 0
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+DEFAULT_RATES = (2, 3, 4, 5)  # TrafficEnv.arrival_rates
+EPISODE_LENGTH = 500
+
+PROFILES = {
+    # sinusoidal peak / off-peak pattern from TrafficEnv._generate_traffic
+    "peak": lambda t: 1.0 + 0.7 * np.sin(t / 40),
+    "flat": lambda t: np.ones_like(t, dtype=float),
+}
+
+
+def demand(rates=DEFAULT_RATES, steps=EPISODE_LENGTH, profile="peak"):
+    """Mean arrivals per step and lane, shape (steps, lanes)."""
+    t = np.arange(steps)
+    return PROFILES[profile](t)[:, None] * np.asarray(rates, dtype=float)
+
+
+def generate_trace(episodes, rates=DEFAULT_RATES, steps=EPISODE_LENGTH,
+                   profile="peak", seed=0):
+    """Poisson arrivals for `episodes` episodes, drawn in one call."""
+    rng = np.random.default_rng(seed)
+    arrivals = rng.poisson(demand(rates, steps, profile), size=(episodes, steps, len(rates)))
+    return np.minimum(arrivals, 255).astype(np.uint8)
+
+
+def save_trace(path, arrivals, **meta):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(path, arrivals)
+    episodes, steps, lanes = arrivals.shape
+    with open(f"{os.path.splitext(path)[0]}.json", "w") as f:
+        json.dump({"episodes": episodes, "steps": steps, "lanes": lanes, **meta}, f, indent=2)
+
+
+def check_trace(trace, steps=EPISODE_LENGTH, lanes=len(DEFAULT_RATES)):
+    """Raise ValueError unless `trace` can drive full episodes of `steps` steps."""
+    shape = np.shape(trace)
+    if len(shape) != 3 or shape[0] < 1 or shape[1] < steps or shape[2] != lanes:
+        raise ValueError(
+            f"arrival trace has shape {shape}; expected (episodes, >= {steps}, {lanes}). "
+            f"Regenerate it with: python -m env.traces PATH --steps {steps}"
+        )
+
+
+def load_trace(path, mmap=True):
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def load_or_generate(path, episodes, rates=DEFAULT_RATES, steps=EPISODE_LENGTH,
+                     profile="peak", seed=0):
+    """Memory-map `path`, generating and saving it first if it doesn't exist."""
+    if not os.path.exists(path):
+        arrivals = generate_trace(episodes, rates, steps, profile, seed)
+        save_trace(path, arrivals, rates=list(rates), profile=profile, seed=seed)
+    return load_trace(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=EPISODE_LENGTH)
+    parser.add_argument("--rates", type=float, nargs=4, default=DEFAULT_RATES)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="peak")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    arrivals = generate_trace(args.episodes, args.rates, args.steps, args.profile, args.seed)
+    save_trace(args.path, arrivals, rates=list(args.rates), profile=args.profile, seed=args.seed)
+    print(f"Wrote {args.path}: {arrivals.shape} ({arrivals.nbytes / 1e6:.1f} MB)")
@@ -1,12 +1,30 @@
 import numpy as np
 import random
 
+from env.metrics import TrafficMetrics
+from env.traces import check_trace
+
 
 class TrafficEnv:
-    def __init__(self):
+    def __init__(self, seed=None, trace=None, track_metrics=False):
         self.num_lanes = 4  # North, South, East, West
         self.max_queue = 50
         self.max_green_time = 30
+        self.arrival_rates = 2 + np.arange(self.num_lanes)  # asymmetric lanes
+
+        # Arrival stream: the global NumPy RNG unless a seed is given, so
+        # two envs built with the same seed see identical arrivals
+        self.rng = np.random if seed is None else np.random.default_rng(seed)
+
+        # Optional pre-generated arrivals (env/traces.py), shape
+        # (episodes, steps, lanes); episodes are replayed in order, cycling
+        if trace is not None:
+            check_trace(trace, 500, self.num_lanes)
+        self.trace = trace
+        self.trace_episode = -1
+
+        # Opt-in KPI accumulators (env/metrics.py), read with metrics()
+        self.tracker = TrafficMetrics(self.num_lanes, self.max_queue) if track_metrics else None
 
         self.reset()
 
@@ -14,10 +32,17 @@ class TrafficEnv:
         self.queues = np.zeros(self.num_lanes, dtype=int)
         self.wait_times = np.zeros(self.num_lanes, dtype=float)
 
-        self.current_green = random.randint(0, self.num_lanes - 1)
+        if self.trace is None:
+            self.current_green = random.randint(0, self.num_lanes - 1)
+        else:
+            # no RNG calls at all when replaying a trace
+            self.trace_episode = (self.trace_episode + 1) % len(self.trace)
+            self.current_green = self.trace_episode % self.num_lanes
         self.green_time = 10
 
         self.time_step = 0
+        if self.tracker is not None:
+            self.tracker.start_episode()
         return self._get_state()
 
     def _get_state(self):
@@ -43,10 +68,15 @@ class TrafficEnv:
         self.current_green = lane
         self.green_time = duration
 
-        self._generate_traffic()
+        queued_before = int(self.queues.sum()) if self.tracker is not None else 0
+        offered = self._generate_traffic()
         cleared = self._clear_traffic(lane, duration)
         self._update_wait_times(lane)
 
+        if self.tracker is not None:
+            self.tracker.record(self.queues, queued_before, offered, int(cleared),
+                                lane, lane != previous_green, duration)
+
         reward = self._calculate_reward(
             cleared, previous_green, self.current_green
         )
@@ -63,19 +93,35 @@ class TrafficEnv:
         """
         Traffic demand changes over time (simulates peak & off-peak hours).
         Fixed-time signals cannot adapt, RL can.
+        Returns the number of arriving vehicles, including any turned away
+        by a full queue.
         """
 
+        if self.trace is not None:
+            arrivals = self.trace[self.trace_episode, self.time_step]
+            self.queues = np.minimum(self.max_queue, self.queues + arrivals)
+            return int(arrivals.sum())
+
         # Sinusoidal peak traffic pattern
         peak_factor = 1.0 + 0.7 * np.sin(self.time_step / 40)
 
+        offered = 0
         for i in range(self.num_lanes):
-            base_rate = 2 + i          # asymmetric lanes
-            arrivals = np.random.poisson(base_rate * peak_factor)
+            base_rate = self.arrival_rates[i]
+            arrivals = self.rng.poisson(base_rate * peak_factor)
+            offered += arrivals
 
             self.queues[i] = min(
                 self.max_queue,
                 self.queues[i] + arrivals
             )
+        return offered
+
+    def metrics(self):
+        """Snapshot of the KPI accumulators (needs track_metrics=True)."""
+        if self.tracker is None:
+            raise RuntimeError("metrics are off; construct TrafficEnv(track_metrics=True)")
+        return self.tracker.snapshot()
 
     def _clear_traffic(self, lane, duration):
         clearance_rate = duration // 2
@@ -0,0 +1,118 @@
+import numpy as np
+
+from env.traces import check_trace
+
+
+class VectorTrafficEnv:
+    """
+    Batched version of TrafficEnv that steps N independent intersections
+    with one set of NumPy calls. Dynamics match TrafficEnv exactly; with
+    auto_reset (the default) finished intersections are reset inside step().
+
+    With a trace (env/traces.py), row i starts on trace episode i and every
+    reset moves a row on to the next unplayed trace episode.
+    """
+
+    def __init__(self, num_envs, seed=None, auto_reset=True, trace=None):
+        self.num_envs = num_envs
+        self.num_lanes = 4  # North, South, East, West
+        self.max_queue = 50
+        self.max_green_time = 30
+        self.episode_length = 500
+        self.auto_reset = auto_reset
+
+        self.rng = np.random.default_rng(seed)
+        if trace is not None:
+            check_trace(trace, self.episode_length, self.num_lanes)
+        self.trace = trace
+        self.trace_episode = np.arange(num_envs) - num_envs
+
+        self.base_rates = 2 + np.arange(self.num_lanes)  # asymmetric lanes
+        self.state_size = 2 * self.num_lanes + 1
+        self._rows = np.arange(num_envs)
+
+        self.queues = np.zeros((num_envs, self.num_lanes), dtype=int)
+        self.wait_times = np.zeros((num_envs, self.num_lanes), dtype=float)
+        self.current_green = np.zeros(num_envs, dtype=int)
+        self.green_time = np.zeros(num_envs, dtype=int)
+        self.time_step = np.zeros(num_envs, dtype=int)
+
+        # terminal observations of intersections that were auto-reset
+        # during the last step(); only rows where dones is True are valid
+        self.final_states = np.zeros((num_envs, self.state_size), dtype=np.float32)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = slice(None)
+
+        self.queues[mask] = 0
+        self.wait_times[mask] = 0.0
+        if self.trace is None:
+            self.current_green[mask] = self.rng.integers(
+                0, self.num_lanes, size=self.num_envs
+            )[mask]
+        else:
+            self.trace_episode[mask] += self.num_envs
+            self.trace_episode[mask] %= len(self.trace)
+            self.current_green[mask] = self.trace_episode[mask] % self.num_lanes
+        self.green_time[mask] = 10
+        self.time_step[mask] = 0
+        return self._get_state()
+
+    def _get_state(self):
+        n = self.num_lanes
+        state = np.empty((self.num_envs, self.state_size), dtype=np.float32)
+        np.divide(self.queues, self.max_queue, out=state[:, :n], casting="unsafe")
+        np.divide(self.wait_times, 100, out=state[:, n:2 * n], casting="unsafe")
+        np.divide(self.current_green, n - 1, out=state[:, 2 * n], casting="unsafe")
+        return state
+
+    def step(self, actions):
+        """
+        actions: int array of shape (N,), same 12-action space as TrafficEnv.
+        Returns (states, rewards, dones) with shapes (N, 9), (N,), (N,).
+        """
+
+        actions = np.asarray(actions, dtype=int)
+        lanes = actions // 3
+        durations = (actions % 3 + 1) * 10
+
+        switched = self.current_green != lanes
+        self.current_green = lanes
+        self.green_time = durations
+
+        if self.trace is None:
+            # Traffic generation (sinusoidal peak, one Poisson draw for all lanes)
+            peak_factor = 1.0 + 0.7 * np.sin(self.time_step / 40)
+            arrivals = self.rng.poisson(peak_factor[:, None] * self.base_rates)
+        else:
+            arrivals = self.trace[self.trace_episode, self.time_step]
+        np.minimum(self.queues + arrivals, self.max_queue, out=self.queues)
+
+        # Clear green lane
+        rows = self._rows
+        cleared = np.minimum(self.queues[rows, lanes], durations // 2)
+        self.queues[rows, lanes] -= cleared
+
+        # Every red lane waits one more tick, green lane resets
+        self.wait_times += 1
+        self.wait_times[rows, lanes] = 0
+
+        rewards = (
+            cleared * 4
+            - self.wait_times.sum(axis=1) * 1.0
+            - self.queues.sum(axis=1) * 0.3
+            - switched * 5
+        )
+
+        self.time_step += 1
+        dones = self.time_step >= self.episode_length
+
+        states = self._get_state()
+        if self.auto_reset and dones.any():
+            self.final_states[dones] = states[dones]
+            states[dones] = self.reset(dones)[dones]
+
+        return states, rewards, dones
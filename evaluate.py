@@ -1,7 +1,12 @@
+import argparse
+
 from env.traffic_env import TrafficEnv
-from agent.dqn_agent import DQNAgent
+from env.event_env import EventTrafficEnv
+from env.vector_env import VectorTrafficEnv
 import numpy as np
-import torch
+import profiling
+
+# torch is imported lazily so the NumPy backend starts without it
 
 EPISODES = 300
 MAX_STEPS = 500
@@ -38,31 +43,287 @@ def run_dqn_policy(env, agent):
 
 
 # ---------------------------
-# SETUP
+# LOCKSTEP BATCHED ENGINE
 # ---------------------------
-env = TrafficEnv()
-state_size = len(env.reset())
-action_size = 12
+def run_fixed_policy_batched(episodes, seed=None, trace=None):
+    """Per-episode congestion area of the round-robin policy, all episodes at once."""
+    env = VectorTrafficEnv(episodes, seed=seed, auto_reset=False, trace=trace)
+    congestion_area = np.zeros(episodes, dtype=np.int64)
+    actions = np.empty(episodes, dtype=int)
+
+    for step in range(MAX_STEPS):
+        actions.fill((step % 4) * 3)
+        _, _, dones = env.step(actions)
+
+        congestion_area += env.queues.sum(axis=1)
+        if dones.all():
+            break
+
+    return congestion_area
+
+
+def run_dqn_policy_batched(network, episodes, seed=None, device="cpu", trace=None):
+    """Per-episode congestion area of a greedy QNetwork, one forward pass per step."""
+    import torch
+
+    env = VectorTrafficEnv(episodes, seed=seed, auto_reset=False, trace=trace)
+    congestion_area = np.zeros(episodes, dtype=np.int64)
+
+    # the constructor already reset every row; another reset() would move
+    # them on to the next trace episodes and unpair them from the fixed run
+    states = env._get_state()
+    network.eval()
+    with torch.inference_mode():
+        for _ in range(MAX_STEPS):
+            q_values = network(torch.from_numpy(states).to(device))
+            actions = q_values.argmax(dim=1).cpu().numpy()
+            states, _, dones = env.step(actions)
+
+            congestion_area += env.queues.sum(axis=1)
+            if dones.all():
+                break
+
+    return congestion_area
 
-agent = DQNAgent(state_size, action_size)
-agent.qnetwork_local.load_state_dict(
-    torch.load("dqn_traffic_model.pth", map_location="cpu")
-)
-agent.epsilon = 0.0  # evaluation mode
 
-fixed_results = []
-dqn_results = []
+def run_numpy_policy_batched(policy, episodes, seed=None, trace=None):
+    """Same as run_dqn_policy_batched for a torch-free NumpyPolicy or LookupPolicy."""
+    env = VectorTrafficEnv(episodes, seed=seed, auto_reset=False, trace=trace)
+    congestion_area = np.zeros(episodes, dtype=np.int64)
+
+    states = env._get_state()  # already reset, as in run_dqn_policy_batched
+    for _ in range(MAX_STEPS):
+        states, _, dones = env.step(policy.act(states))
+
+        congestion_area += env.queues.sum(axis=1)
+        if dones.all():
+            break
+
+    return congestion_area
+
 
 # ---------------------------
-# EVALUATION LOOP
+# SEQUENTIAL PAIRED TESTING
 # ---------------------------
-for _ in range(EPISODES):
-    fixed_results.append(run_fixed_policy(env))
-    dqn_results.append(run_dqn_policy(env, agent))
+def confidence_halfwidth(n, sd, alpha=0.05, n_opt=32):
+    """
+    Half-width of a normal-mixture confidence sequence for a mean after n
+    observations: valid at every n simultaneously, so the test may be
+    checked after each block and stopped early without inflating alpha.
+    n_opt is the sample size where the boundary is tightest.
+    """
+    log_alpha = -2 * np.log(alpha)
+    rho2 = (log_alpha + np.log(log_alpha + 1)) / n_opt
+    v = n * rho2 + 1
+    return sd * np.sqrt(2 * v / (n * n * rho2) * np.log(np.sqrt(v) / alpha))
+
+
+def run_until_decided(run_dqn, budget, seed=0, alpha=0.05, block=8, min_effect=0.0):
+    """
+    Stream paired episodes (fixed and DQN on the same arrival trace) in
+    blocks until the confidence sequence on the congestion difference
+    excludes zero, fits inside +-min_effect (no meaningful difference), or
+    the episode budget runs out.
+    Returns the report and the per-episode fixed and DQN congestion areas.
+    """
+    from env.traces import generate_trace
+
+    trace = generate_trace(budget, seed=seed)
+    diffs = np.empty(0)
+    fixed = np.empty(0)
+    decision = "budget exhausted"
+
+    for start in range(0, budget, block):
+        segment = trace[start:start + block]
+        fixed_block = run_fixed_policy_batched(len(segment), trace=segment)
+        dqn_block = run_dqn(segment)
+        fixed = np.append(fixed, fixed_block)
+        diffs = np.append(diffs, dqn_block - fixed_block.astype(float))
+
+        n = len(diffs)
+        if n < 2:
+            continue
+        mean = diffs.mean()
+        halfwidth = confidence_halfwidth(n, diffs.std(ddof=1), alpha)
+        if abs(mean) > halfwidth:
+            decision = "dqn better" if mean < 0 else "fixed better"
+            break
+        if abs(mean) + halfwidth <= min_effect:
+            decision = "no meaningful difference"
+            break
+
+    sd = diffs.std(ddof=1)
+    report = {
+        "decision": decision,
+        "episodes": int(n),
+        "dqn_minus_fixed": float(mean),
+        "ci": [float(mean - halfwidth), float(mean + halfwidth)],
+        "relative_change": float(mean / fixed.mean()),
+        "cohens_d": float(mean / sd) if sd > 0 else float("inf"),
+    }
+    return report, fixed, fixed + diffs
+
+
+def load_array_policy(numpy_model=None, lookup_model=None):
+    """Torch-free policy from exported weights or a compiled lookup table."""
+    if lookup_model:
+        from agent.lookup_policy import LookupPolicy
+
+        return LookupPolicy.load(lookup_model)
+    from agent.numpy_policy import NumpyPolicy
+
+    return NumpyPolicy.load(numpy_model)
+
+
+def load_agent(path="dqn_traffic_model.pth"):
+    import torch
+    from agent.dqn_agent import DQNAgent
+
+    state_size = len(TrafficEnv().reset())
+    action_size = 12
+
+    agent = DQNAgent(state_size, action_size)
+    agent.qnetwork_local.load_state_dict(
+        torch.load(path, map_location=agent.device)
+    )
+    agent.epsilon = 0.0  # evaluation mode
+    return agent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=EPISODES)
+    parser.add_argument("--model", default="dqn_traffic_model.pth")
+    parser.add_argument("--numpy-model", default=None,
+                        help="exported .npy weights; evaluate without importing torch")
+    parser.add_argument("--lookup-model", default=None,
+                        help="compiled .npz lookup table (agent.lookup_policy); no torch")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sequential", action="store_true",
+                        help="run episodes one after another through TrafficEnv")
+    parser.add_argument("--engine", choices=["step", "event"], default="step",
+                        help="event: run sequentially on the second-resolution EventTrafficEnv")
+    parser.add_argument("--arrival-trace", default=None,
+                        help="replay this .npy arrival trace for both policies "
+                             "(generated from --seed if missing)")
+    parser.add_argument("--until-decided", action="store_true",
+                        help="paired sequential test: stop once the fixed-vs-DQN difference "
+                             "is decided (--episodes is the budget)")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--block", type=int, default=8,
+                        help="paired episodes per look in --until-decided mode")
+    parser.add_argument("--min-effect", type=float, default=0.0,
+                        help="also stop when the CI fits inside +-this congestion difference")
+    parser.add_argument("--kpis", action="store_true",
+                        help="sequential TrafficEnv run with streaming KPIs (throughput, "
+                             "delay, max queue, wait percentiles) per policy")
+    parser.add_argument("--telemetry", default=None,
+                        help="run directory for per-episode congestion results")
+    parser.add_argument("--profile", default=None,
+                        help=f"write a Chrome trace here and print a phase breakdown "
+                             f"(or set {profiling.ENV_VAR})")
+    args = parser.parse_args()
+
+    if args.kpis and args.engine == "event":
+        parser.error("--kpis reads TrafficEnv accumulators; use --engine step")
+    if args.kpis and args.until_decided:
+        parser.error("--kpis runs a fixed number of episodes; drop --until-decided")
+    if args.until_decided and (args.engine == "event" or args.sequential):
+        parser.error("--until-decided replays arrival traces in batches; "
+                     "use --engine step without --sequential")
+
+    profiler = profiling.start(args.profile)
+
+    if args.until_decided:
+        if args.episodes < 2:
+            parser.error("--until-decided needs a budget of at least 2 episodes")
+        if args.numpy_model or args.lookup_model:
+            policy = load_array_policy(args.numpy_model, args.lookup_model)
+            run_dqn = lambda trace: run_numpy_policy_batched(policy, len(trace), trace=trace)
+        else:
+            agent = load_agent(args.model)
+            run_dqn = lambda trace: run_dqn_policy_batched(
+                agent.qnetwork_local, len(trace), device=agent.device, trace=trace
+            )
+
+        report, fixed_results, dqn_results = run_until_decided(
+            run_dqn, args.episodes, seed=args.seed if args.seed is not None else 0,
+            alpha=args.alpha, block=args.block, min_effect=args.min_effect
+        )
+        print("Sequential evaluation:", report)
+    else:
+        # Common random numbers: with a trace both policies replay the same
+        # arrivals, otherwise they get independent streams (seed, seed + 1)
+        trace = None
+        if args.arrival_trace:
+            if args.engine == "event":
+                parser.error("--arrival-trace replays per-step arrivals; use --engine step")
+            from env.traces import check_trace, load_or_generate
+
+            trace = load_or_generate(args.arrival_trace, args.episodes,
+                                     seed=args.seed if args.seed is not None else 0)
+            try:
+                check_trace(trace)
+            except ValueError as exc:
+                parser.error(f"{args.arrival_trace}: {exc}")
+            args.episodes = min(args.episodes, len(trace))
+
+        seed = args.seed
+        dqn_seed = None if seed is None else seed + 1
+
+        array_policy = args.numpy_model or args.lookup_model
+        if args.sequential or args.kpis or args.engine == "event":
+            # array policies share act(state) -> int with DQNAgent
+            if array_policy:
+                agent = load_array_policy(args.numpy_model, args.lookup_model)
+            else:
+                agent = load_agent(args.model)
+            if args.engine == "event":
+                env_fixed = env_dqn = EventTrafficEnv()
+            elif trace is not None or args.kpis:
+                env_fixed = TrafficEnv(trace=trace, track_metrics=args.kpis)
+                env_dqn = TrafficEnv(trace=trace, track_metrics=args.kpis)
+            else:
+                env_fixed = env_dqn = TrafficEnv()
+            fixed_results = []
+            dqn_results = []
+
+            for _ in range(args.episodes):
+                fixed_results.append(run_fixed_policy(env_fixed))
+                dqn_results.append(run_dqn_policy(env_dqn, agent))
+        elif array_policy:
+            policy = load_array_policy(args.numpy_model, args.lookup_model)
+            fixed_results = run_fixed_policy_batched(args.episodes, seed, trace)
+            dqn_results = run_numpy_policy_batched(policy, args.episodes, dqn_seed, trace)
+        else:
+            agent = load_agent(args.model)
+            fixed_results = run_fixed_policy_batched(args.episodes, seed, trace)
+            dqn_results = run_dqn_policy_batched(
+                agent.qnetwork_local, args.episodes, dqn_seed, agent.device, trace
+            )
+
+        results = {
+            "fixed": float(np.mean(fixed_results)),
+            "dqn": float(np.mean(dqn_results))
+        }
+        if trace is not None and args.episodes > 1:
+            # paired episodes: the difference has much lower variance
+            diff = np.asarray(dqn_results, dtype=float) - np.asarray(fixed_results, dtype=float)
+            results["dqn_minus_fixed"] = float(diff.mean())
+            results["ci95"] = float(1.96 * diff.std(ddof=1) / np.sqrt(len(diff)))
+
+        print("Evaluation complete:", results)
+        if args.kpis:
+            for name, env in (("fixed", env_fixed), ("dqn", env_dqn)):
+                kpis = {k: v for k, v in env.metrics().items() if k != "queue_histogram"}
+                print(f"KPIs ({name}):", kpis)
+
+    profiling.finish(profiler)
 
-results = {
-    "fixed": float(np.mean(fixed_results)),
-    "dqn": float(np.mean(dqn_results))
-}
+    if args.telemetry:
+        from telemetry import Telemetry
 
-print("Evaluation complete:", results)
+        telemetry = Telemetry(args.telemetry, meta={"script": "evaluate.py", **vars(args)},
+                              log_steps=False)
+        telemetry.evaluation_results(np.asarray(fixed_results), np.asarray(dqn_results))
+        telemetry.close()
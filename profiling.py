@@ -0,0 +1,145 @@
+"""
+Opt-in hot-path profiling for training and evaluation.
+
+Nothing is wrapped unless profiling is switched on, so a normal run pays
+nothing. Enable it with a flag or an environment variable:
+
+    python train.py --profile trace.json
+    TRAFFIC_PROFILE=trace.json python evaluate.py
+
+At exit a per-phase table is printed and a Chrome-trace JSON file is
+written; open it in chrome://tracing or https://ui.perfetto.dev.
+"""
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+
+ENV_VAR = "TRAFFIC_PROFILE"
+
+# (module, class, method) pairs that get timers when profiling is on
+HOOKS = [
+    ("env.traffic_env", "TrafficEnv", "step"),
+    ("env.traffic_env", "TrafficEnv", "_generate_traffic"),
+    ("env.vector_env", "VectorTrafficEnv", "step"),
+    ("agent.dqn_agent", "ReplayBuffer", "sample"),
+    ("agent.dqn_agent", "PrioritizedReplayBuffer", "sample"),
+    ("agent.dqn_agent", "DQNAgent", "act"),
+    ("agent.dqn_agent", "DQNAgent", "learn"),
+    ("agent.dqn_agent", "DQNAgent", "soft_update"),
+]
+# subclasses share the parent's label so overrides add up together
+LABELS = {"PrioritizedReplayBuffer": "ReplayBuffer"}
+
+
+class Profiler:
+    """
+    Monotonic-clock timers and call counters around the HOOKS methods.
+    Totals are inclusive; self time excludes nested hooked calls.
+    """
+
+    def __init__(self, path, max_events=1_000_000):
+        self.path = path
+        self.max_events = max_events
+        self.events = []  # (name, start_ns, duration_ns, thread id)
+        self.calls = {}
+        self.total_ns = {}
+        self.self_ns = {}
+        self.originals = []
+        self.local = threading.local()
+        self.started_ns = None
+
+    def _wrap(self, name, method):
+        clock = time.perf_counter_ns
+        local = self.local
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            stack.append(0)  # time spent in nested hooked calls
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                duration = clock() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += duration
+
+                self.calls[name] = self.calls.get(name, 0) + 1
+                self.total_ns[name] = self.total_ns.get(name, 0) + duration
+                self.self_ns[name] = self.self_ns.get(name, 0) + duration - nested
+                if len(self.events) < self.max_events:
+                    self.events.append((name, start, duration, threading.get_ident()))
+
+        return timed
+
+    def install(self):
+        for module_name, class_name, method_name in HOOKS:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            method = cls.__dict__.get(method_name)
+            if method is None:
+                continue
+            self.originals.append((cls, method_name, method))
+            label = f"{LABELS.get(class_name, class_name)}.{method_name}"
+            setattr(cls, method_name, self._wrap(label, method))
+        self.started_ns = time.perf_counter_ns()
+        return self
+
+    def uninstall(self):
+        for cls, method_name, method in reversed(self.originals):
+            setattr(cls, method_name, method)
+        self.originals = []
+
+    # ------------------------------
+    # Output
+    # ------------------------------
+    def report(self):
+        wall_ns = max(time.perf_counter_ns() - self.started_ns, 1)
+        lines = [
+            f"{'phase':<34}{'calls':>10}{'total ms':>12}{'self ms':>12}"
+            f"{'mean us':>10}{'% wall':>8}"
+        ]
+        for name in sorted(self.total_ns, key=self.total_ns.get, reverse=True):
+            calls = self.calls[name]
+            total = self.total_ns[name]
+            lines.append(
+                f"{name:<34}{calls:>10}{total / 1e6:>12.1f}{self.self_ns[name] / 1e6:>12.1f}"
+                f"{total / calls / 1e3:>10.1f}{100 * total / wall_ns:>7.1f}%"
+            )
+        lines.append(f"wall time: {wall_ns / 1e9:.2f}s")
+        if len(self.events) >= self.max_events:
+            lines.append(f"trace truncated to the first {self.max_events} events")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Chrome trace event format: complete ("X") events in microseconds."""
+        pid = os.getpid()
+        events = [
+            {"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - self.started_ns) / 1e3, "dur": duration / 1e3}
+            for name, start, duration, tid in self.events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def start(path=None):
+    """Install hooks if a trace path is given or set in TRAFFIC_PROFILE."""
+    path = path or os.environ.get(ENV_VAR)
+    if not path:
+        return None
+    return Profiler(path).install()
+
+
+def finish(profiler):
+    if profiler is None:
+        return
+    profiler.uninstall()
+    print(profiler.report())
+    profiler.write_trace(profiler.path)
+    print(f"Chrome trace written to {profiler.path}")
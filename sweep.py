@@ -0,0 +1,205 @@
+"""
+Parallel hyperparameter sweep with successive halving.
+
+Trials sample DQNAgent hyperparameters from a search space and train in a
+process pool, one single-threaded worker per core. After every rung each
+surviving trial is scored against the fixed round-robin policy on a shared
+arrival trace (lower congestion ratio is better) and only the best 1/eta
+continue, resuming from their checkpoint with eta times the episode budget.
+
+Run from the repository root:
+    python sweep.py --trials 27 --workers 4
+    python sweep.py --space space.json --min-episodes 10 --max-episodes 270
+
+The search space is a JSON object: a list is sampled uniformly, while
+{"log": [low, high]} and {"uniform": [low, high]} are continuous ranges.
+Results go to sweeps/<name>/leaderboard.json.
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+from env.traffic_env import TrafficEnv
+from env.traces import load_or_generate
+from agent.dqn_agent import DQNAgent
+from agent.checkpoint import load_checkpoint, save_checkpoint, snapshot
+import evaluate
+import train
+
+SEARCH_SPACE = {
+    "gamma": [0.95, 0.98, 0.99, 0.995],
+    "lr": {"log": [1e-4, 3e-3]},
+    "epsilon_decay": [0.99, 0.995, 0.998],
+    "batch_size": [32, 64, 128],
+    "update_every": [1, 2, 4, 8],
+    "tau": {"log": [1e-3, 5e-2]},
+    "double_dqn": [False, True],
+    "gradient_steps": [1, 2],
+}
+
+
+def sample_config(space, rng):
+    config = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            config[name] = spec[rng.randrange(len(spec))]
+        elif "log" in spec:
+            low, high = spec["log"]
+            config[name] = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            low, high = spec["uniform"]
+            config[name] = rng.uniform(low, high)
+    return config
+
+
+# ------------------------------
+# Worker
+# ------------------------------
+def _init_worker(cores):
+    # one core and one torch thread per worker, so trials don't contend
+    core = cores.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    torch.set_num_threads(1)
+
+
+def run_trial(trial_id, config, episodes, directory, trace_path, max_steps, seed):
+    """Train a trial up to `episodes` (resuming its checkpoint) and evaluate it."""
+    checkpoint = os.path.join(directory, f"trial-{trial_id:03d}.npz")
+
+    train.seed_everything(seed)
+
+    env = TrafficEnv()
+    agent = DQNAgent(len(env.reset()), 12, **config)
+    agent.memory.rng = np.random.default_rng(seed)
+
+    start_episode = load_checkpoint(checkpoint, agent) if os.path.exists(checkpoint) else 0
+
+    start = time.perf_counter()
+    train.train(agent, env, start_episode, episodes=episodes, max_steps=max_steps, log=None)
+    seconds = time.perf_counter() - start
+
+    save_checkpoint(checkpoint, *snapshot(agent, episodes - 1))
+
+    trace = np.load(trace_path, mmap_mode="r")
+    congestion = evaluate.run_dqn_policy_batched(
+        agent.qnetwork_local, len(trace), device=agent.device, trace=trace
+    ).mean()
+    return trial_id, float(congestion), seconds
+
+
+# ------------------------------
+# Successive Halving
+# ------------------------------
+def successive_halving(pool, trials, directory, trace_path, fixed, min_episodes,
+                       max_episodes, eta, max_steps, seed, log=print):
+    survivors = list(range(len(trials)))
+    budget = min_episodes
+    rung = 0
+
+    while True:
+        futures = [
+            pool.submit(run_trial, t, trials[t]["config"], budget, directory,
+                        trace_path, max_steps, seed + t)
+            for t in survivors
+        ]
+        for future in futures:
+            t, congestion, seconds = future.result()
+            trial = trials[t]
+            trial.update(rung=rung, episodes=budget, congestion=congestion,
+                         score=congestion / fixed)
+            trial["train_seconds"] = trial.get("train_seconds", 0.0) + seconds
+
+        survivors.sort(key=lambda t: trials[t]["score"])
+        log(
+            f"Rung {rung} | {budget} episodes | {len(survivors)} trials | "
+            f"best score {trials[survivors[0]]['score']:.3f}"
+        )
+
+        next_budget = min(budget * eta, max_episodes)
+        keep = max(1, len(survivors) // eta)
+        if next_budget == budget or len(survivors) == 1:
+            break
+
+        # eliminated trials free their checkpoints
+        for t in survivors[keep:]:
+            os.remove(os.path.join(directory, f"trial-{t:03d}.npz"))
+        survivors = survivors[:keep]
+        budget = next_budget
+        rung += 1
+
+    return sorted(trials, key=lambda trial: (-trial["rung"], trial["score"]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--name", default=time.strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--space", default=None, help="JSON search space (default: SEARCH_SPACE)")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--min-episodes", type=int, default=10)
+    parser.add_argument("--max-episodes", type=int, default=270)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--max-steps", type=int, default=200)
+    parser.add_argument("--eval-episodes", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    space = SEARCH_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+
+    directory = os.path.join("sweeps", args.name)
+    os.makedirs(directory, exist_ok=True)
+
+    # every trial is scored on the same arrivals as the fixed baseline
+    trace_path = os.path.join(directory, "eval_trace.npy")
+    trace = load_or_generate(trace_path, args.eval_episodes, seed=args.seed)
+    fixed = float(evaluate.run_fixed_policy_batched(len(trace), trace=trace).mean())
+    print(f"Fixed round-robin congestion area: {fixed:.0f}")
+
+    rng = random.Random(args.seed)
+    trials = [{"trial": t, "config": sample_config(space, rng)} for t in range(args.trials)]
+
+    ctx = mp.get_context("spawn")
+    cores = ctx.Queue()
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+        else list(range(os.cpu_count()))
+    workers = min(args.workers, args.trials)
+    for i in range(workers):
+        cores.put(available[i % len(available)])
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(cores,)) as pool:
+        leaderboard = successive_halving(
+            pool, trials, directory, trace_path, fixed, args.min_episodes,
+            args.max_episodes, args.eta, args.max_steps, args.seed
+        )
+
+    with open(os.path.join(directory, "leaderboard.json"), "w") as f:
+        json.dump({"fixed": fixed, "args": vars(args), "trials": leaderboard}, f, indent=2)
+
+    print(f"\nSweep finished in {time.perf_counter() - start:.0f}s -> {directory}/leaderboard.json")
+    for rank, trial in enumerate(leaderboard[:10], 1):
+        config = ", ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in trial["config"].items()
+        )
+        print(
+            f"{rank:>2}. trial {trial['trial']:>3} | score {trial['score']:.3f} | "
+            f"{trial['episodes']} episodes | {config}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Columnar telemetry for training and evaluation runs.
+
+Records are buffered in preallocated typed arrays and flushed in chunks to
+an append-only run directory:
+
+    runs/<run>/meta.json
+    runs/<run>/steps-00000.npz, steps-00001.npz, ...
+    runs/<run>/episodes-00000.npz, ...
+
+Every chunk is a plain .npz holding one array per column, written to a
+temporary file and renamed, so a crashed run leaves only whole chunks.
+
+Compare runs from the repository root:
+    python telemetry.py runs/
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+STEP_COLUMNS = {
+    "episode": (np.int32, ()),
+    "step": (np.int32, ()),
+    "action": (np.int8, ()),
+    "reward": (np.float32, ()),
+    "queues": (np.int16, (4,)),
+    "env_seconds": (np.float32, ()),
+    "agent_seconds": (np.float32, ()),
+}
+
+EPISODE_COLUMNS = {
+    "episode": (np.int32, ()),
+    "steps": (np.int32, ()),
+    "total_reward": (np.float32, ()),
+    "mean_loss": (np.float32, ()),
+    "updates": (np.int32, ()),
+    "epsilon": (np.float32, ()),
+    "env_seconds": (np.float32, ()),
+    "agent_seconds": (np.float32, ()),
+}
+
+EVAL_COLUMNS = {
+    "episode": (np.int32, ()),
+    "fixed": (np.int64, ()),
+    "dqn": (np.int64, ()),
+}
+
+
+# ------------------------------
+# Chunked Column Table
+# ------------------------------
+class ColumnTable:
+    """Fixed-schema table that buffers rows in typed arrays and writes chunks."""
+
+    def __init__(self, directory, name, columns, chunk_size=65536):
+        self.directory = directory
+        self.name = name
+        self.chunk_size = chunk_size
+        self.columns = {
+            col: np.zeros((chunk_size, *shape), dtype=dtype)
+            for col, (dtype, shape) in columns.items()
+        }
+        self.rows = 0
+        # continue numbering after chunks left by an earlier (resumed) run
+        self.chunk = len(_chunk_files(directory, name))
+
+    def append(self, **values):
+        i = self.rows
+        for col, value in values.items():
+            self.columns[col][i] = value
+        self.rows = i + 1
+        if self.rows == self.chunk_size:
+            self.flush()
+
+    def extend(self, **arrays):
+        """Append many rows at once from equal-length arrays."""
+        n = len(next(iter(arrays.values())))
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_size - self.rows)
+            for col, array in arrays.items():
+                self.columns[col][self.rows:self.rows + take] = array[start:start + take]
+            self.rows += take
+            start += take
+            if self.rows == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        if self.rows == 0:
+            return
+
+        path = os.path.join(self.directory, f"{self.name}-{self.chunk:05d}.npz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{col: array[:self.rows] for col, array in self.columns.items()})
+        os.replace(tmp_path, path)
+
+        self.chunk += 1
+        self.rows = 0
+
+
+def _chunk_files(directory, name):
+    return sorted(
+        f for f in os.listdir(directory)
+        if f.startswith(f"{name}-") and f.endswith(".npz")
+    )
+
+
+def read_table(directory, name):
+    """Concatenate all chunks of one table into a dict of column arrays."""
+    chunks = []
+    for filename in _chunk_files(directory, name):
+        with np.load(os.path.join(directory, filename)) as data:
+            chunks.append({col: data[col] for col in data.files})
+    if not chunks:
+        return {}
+    return {col: np.concatenate([c[col] for c in chunks]) for col in chunks[0]}
+
+
+# ------------------------------
+# Run Logger
+# ------------------------------
+class Telemetry:
+    """
+    Per-step and per-episode records for one run. Step rows are cheap
+    (a few array stores); the episode row aggregates them.
+    """
+
+    def __init__(self, directory, meta=None, chunk_size=65536, log_steps=True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.log_steps = log_steps
+
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w") as f:
+                json.dump({"created": time.time(), **(meta or {})}, f, indent=2)
+
+        self.steps = ColumnTable(directory, "steps", STEP_COLUMNS, chunk_size) if log_steps else None
+        self.episodes = ColumnTable(directory, "episodes", EPISODE_COLUMNS, 4096)
+        self.evaluation = None
+
+    def step(self, episode, step, action, reward, queues, env_seconds, agent_seconds):
+        if self.log_steps:
+            self.steps.append(
+                episode=episode, step=step, action=action, reward=reward,
+                queues=queues, env_seconds=env_seconds, agent_seconds=agent_seconds
+            )
+
+    def episode(self, **values):
+        self.episodes.append(**values)
+
+    def evaluation_results(self, fixed, dqn):
+        if self.evaluation is None:
+            self.evaluation = ColumnTable(self.directory, "evaluation", EVAL_COLUMNS, 4096)
+        self.evaluation.extend(episode=np.arange(len(fixed)), fixed=fixed, dqn=dqn)
+
+    def close(self):
+        for table in (self.steps, self.episodes, self.evaluation):
+            if table is not None:
+                table.flush()
+
+
+# ------------------------------
+# Run Comparison
+# ------------------------------
+def summarize_runs(root, last=100):
+    """One summary row per run directory under root."""
+    rows = []
+    for run in sorted(os.listdir(root)):
+        directory = os.path.join(root, run)
+        if not os.path.isfile(os.path.join(directory, "meta.json")):
+            continue
+
+        episodes = read_table(directory, "episodes")
+        evaluation = read_table(directory, "evaluation")
+        row = {"run": run, "episodes": 0}
+        if episodes:
+            env_seconds = episodes["env_seconds"].sum()
+            agent_seconds = episodes["agent_seconds"].sum()
+            row.update(
+                episodes=len(episodes["episode"]),
+                reward=float(episodes["total_reward"][-last:].mean()),
+                loss=float(np.nanmean(episodes["mean_loss"][-last:])),
+                env_share=float(env_seconds / max(env_seconds + agent_seconds, 1e-12)),
+            )
+        if evaluation:
+            row.update(
+                fixed=float(evaluation["fixed"].mean()),
+                dqn=float(evaluation["dqn"].mean()),
+            )
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("root", help="directory containing one subdirectory per run")
+    parser.add_argument("--last", type=int, default=100,
+                        help="episodes averaged for the reward and loss columns")
+    args = parser.parse_args()
+
+    for row in summarize_runs(args.root, args.last):
+        print(" | ".join(
+            f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}"
+            for key, value in row.items()
+        ))
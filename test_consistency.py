@@ -0,0 +1,294 @@
+"""
+Consistency checks for claims other modules rely on (run with pytest).
+"""
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+from agent.checkpoint import AsyncCheckpointer, load_checkpoint
+from agent.distributed import train_distributed
+from agent.dqn_agent import DQNAgent, QNetwork
+from agent.policy_server import PolicyServer
+from env.network_env import NetworkTrafficEnv
+from env.sharded_env import LOOPBACK_AUTHKEY, ShardedNetworkEnv, resolve_authkey
+from env.traces import generate_trace
+from env.traffic_env import TrafficEnv
+from env.vector_env import VectorTrafficEnv
+import evaluate
+import simulation
+import train
+
+
+class RoundRobin(torch.nn.Module):
+    """The fixed round-robin policy, as a network and as an array policy."""
+
+    def __init__(self):
+        super().__init__()
+        self.t = 0
+
+    def act(self, states):
+        actions = np.full(len(states), (self.t % 4) * 3)
+        self.t += 1
+        return actions
+
+    def forward(self, states):
+        q_values = torch.zeros(len(states), 12)
+        q_values[np.arange(len(states)), self.act(states)] = 1.0
+        return q_values
+
+
+def test_simulate_scenario_runs_end_to_end():
+    torch.manual_seed(0)
+    network = QNetwork(simulation.STATE_SIZE, simulation.ACTION_SIZE).eval()
+
+    for steps in (50, 300):
+        trace = simulation.simulate_scenario(network, "Emergency Event", steps)
+        assert trace["queues"].shape == (2, steps, 4)
+        assert trace["actions"].shape == (2, steps)
+        assert trace["emergency"].any()
+        np.testing.assert_array_equal(trace["loads"], trace["queues"].sum(axis=2))
+        assert simulation.trace_insight(trace, steps - 1)["title"]
+
+
+def test_batched_evaluators_replay_the_same_trace_rows():
+    # a trace longer than the run, as in the README workflow
+    trace = generate_trace(12, seed=3)
+    episodes = 5
+
+    fixed = evaluate.run_fixed_policy_batched(episodes, trace=trace)
+    dqn = evaluate.run_dqn_policy_batched(RoundRobin(), episodes, trace=trace)
+    array = evaluate.run_numpy_policy_batched(RoundRobin(), episodes, trace=trace)
+
+    np.testing.assert_array_equal(fixed, dqn)
+    np.testing.assert_array_equal(fixed, array)
+    # and the rows are trace episodes 0..episodes-1
+    np.testing.assert_array_equal(
+        fixed, evaluate.run_fixed_policy_batched(episodes, trace=trace[:episodes])
+    )
+
+
+def test_no_meaningful_difference_means_ci_inside_min_effect():
+    rng = np.random.default_rng(0)
+
+    def run_dqn(trace):
+        fixed = evaluate.run_fixed_policy_batched(len(trace), trace=trace)
+        return fixed + 10 + rng.normal(0, 40, len(trace))
+
+    report, _, _ = evaluate.run_until_decided(run_dqn, 400, block=8, min_effect=40)
+    assert report["decision"] == "no meaningful difference"
+    low, high = report["ci"]
+    assert -40 <= low <= high <= 40
+
+
+def test_starved_lanes_count_in_wait_percentiles():
+    env = TrafficEnv(seed=0, track_metrics=True)
+    for _ in range(500):
+        env.step(0)  # North green for 10 s, every step
+
+    kpis = env.metrics()
+    assert kpis["wait_max_seconds"] == 5000
+    assert kpis["wait_p99_seconds"] == pytest.approx(5000, rel=0.02)
+
+    # closed at the next reset, and counted only once
+    env.reset()
+    closed = env.tracker.wait_sketch.count
+    env.reset()
+    assert env.tracker.wait_sketch.count == closed
+    assert env.metrics()["wait_max_seconds"] == 5000
+
+
+def _rollout(env, steps=30):
+    """Stacked observations and rewards under one fixed random action sequence."""
+    rng = np.random.default_rng(1)
+    try:
+        states, rewards = [env.reset()], []
+        for _ in range(steps):
+            state, reward, _ = env.step(rng.integers(0, 12, env.num_nodes))
+            states.append(state)
+            rewards.append(reward)
+    finally:
+        if hasattr(env, "close"):
+            env.close()
+    return np.stack(states), np.stack(rewards)
+
+
+def test_remote_shard_workers_match_local_shards():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    workers = []
+
+    def launch(message):
+        # called once the coordinator listens; stands in for other hosts
+        for _ in range(2):
+            workers.append(subprocess.Popen(
+                [sys.executable, "-m", "env.sharded_env", "--worker", f"127.0.0.1:{port}"]
+            ))
+
+    local = _rollout(ShardedNetworkEnv.grid(6, 6, 3, transport="shm", seed=5))
+    remote = _rollout(ShardedNetworkEnv.grid(
+        6, 6, 3, transport="socket", seed=5, port=port, remote_shards=2, log=launch
+    ))
+    assert [worker.wait(timeout=30) for worker in workers] == [0, 0]
+    for a, b in zip(local, remote):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_public_authkey_is_refused_off_loopback(monkeypatch):
+    monkeypatch.delenv("TRAFFIC_SHARDS_AUTHKEY", raising=False)
+    assert resolve_authkey(None, "127.0.0.1") == LOOPBACK_AUTHKEY
+    for key in (None, LOOPBACK_AUTHKEY):
+        with pytest.raises(ValueError):
+            resolve_authkey(key, "0.0.0.0")
+    with pytest.raises(ValueError):
+        ShardedNetworkEnv.grid(4, 4, 2, transport="socket", bind="0.0.0.0")
+    assert resolve_authkey(b"secret", "0.0.0.0") == b"secret"
+    monkeypatch.setenv("TRAFFIC_SHARDS_AUTHKEY", "from-env")
+    assert resolve_authkey(None, "0.0.0.0") == b"from-env"
+
+
+def test_vector_env_matches_scalar_env():
+    trace = generate_trace(3, seed=1)
+    vector = VectorTrafficEnv(3, trace=trace)
+    # row i starts on trace episode i, the scalar env after i resets
+    scalars = [TrafficEnv(trace=trace) for _ in range(3)]
+    for i, env in enumerate(scalars):
+        for _ in range(i):
+            env.reset()
+    rng = np.random.default_rng(0)
+
+    np.testing.assert_array_equal(vector._get_state(), [env._get_state() for env in scalars])
+    for _ in range(vector.episode_length):
+        actions = rng.integers(0, 12, 3)
+        states, rewards, dones = vector.step(actions)
+        expected = [env.step(a) for env, a in zip(scalars, actions)]
+
+        np.testing.assert_array_equal(rewards, [r for _, r, _ in expected])
+        np.testing.assert_array_equal(dones, [d for _, _, d in expected])
+        finished = np.where(dones[:, None], vector.final_states, states)
+        np.testing.assert_array_equal(finished, [s for s, _, _ in expected])
+    assert dones.all()
+
+
+@pytest.mark.parametrize("prioritized", [False, True])
+def test_resumed_training_reproduces_uninterrupted_run(tmp_path, prioritized):
+    path = str(tmp_path / "checkpoint.npz")
+
+    def run(episodes, start=0, checkpointer=None):
+        train.train(agent, env, start, checkpointer, checkpoint_every=2,
+                    episodes=episodes, max_steps=50, log=None)
+
+    def fresh():
+        train.seed_everything(0)
+        agent = DQNAgent(9, 12, prioritized=prioritized, batch_size=16)
+        agent.memory.rng = np.random.default_rng(0)
+        return TrafficEnv(), agent
+
+    env, agent = fresh()
+    run(4)
+    uninterrupted = agent
+
+    env, agent = fresh()
+    checkpointer = AsyncCheckpointer(path)
+    run(2, checkpointer=checkpointer)
+    checkpointer.close()
+
+    env, agent = fresh()
+    start = load_checkpoint(path, agent)
+    assert start == 2
+    run(4, start)
+
+    assert agent.epsilon == uninterrupted.epsilon
+    for a, b in zip(agent.qnetwork_local.parameters(), uninterrupted.qnetwork_local.parameters()):
+        assert torch.equal(a, b)
+
+
+def test_memmap_resume_drops_slots_written_after_checkpoint(tmp_path):
+    path, replay_dir = str(tmp_path / "checkpoint.npz"), str(tmp_path / "replay")
+    rng = np.random.default_rng(0)
+
+    def add(agent, n):
+        states = rng.integers(0, 10, (n + 1, 9)) / 50
+        states[:, 8] = rng.integers(0, 4, n + 1) / 3  # green lane
+        agent.memory.add_batch(states[:-1], np.zeros(n), np.zeros(n), states[1:], np.zeros(n))
+        return states
+
+    agent = DQNAgent(9, 12, buffer_size=50, replay_dir=replay_dir)
+    kept = add(agent, 30)
+    checkpointer = AsyncCheckpointer(path)
+    checkpointer.submit(agent, 0)
+    checkpointer.close()
+    add(agent, 25)  # wraps into the 5 oldest checkpointed slots, then crashes
+
+    resumed = DQNAgent(9, 12, buffer_size=50, replay_dir=replay_dir)
+    load_checkpoint(path, resumed)
+    assert (resumed.memory.pos, resumed.memory.size) == (30, 25)
+    idx = np.sort(resumed.memory.sample_indices(1000))
+    assert idx[0] >= 5 and idx[-1] <= 28
+    states, _, _, next_states, _ = resumed.memory.gather(np.arange(5, 29))
+    np.testing.assert_allclose(states.cpu().numpy(), kept[5:29], atol=1e-6)
+    np.testing.assert_allclose(next_states.cpu().numpy(), kept[6:30], atol=1e-6)
+
+    with pytest.raises(ValueError):
+        load_checkpoint(path, DQNAgent(9, 12, buffer_size=60, replay_dir=str(tmp_path / "other")))
+
+
+def test_single_shard_matches_network_env():
+    seed = np.random.SeedSequence(7).spawn(1)[0]
+    single = _rollout(NetworkTrafficEnv.grid(5, 5, seed=seed))
+    sharded = _rollout(ShardedNetworkEnv.grid(5, 5, 1, seed=7))
+    for a, b in zip(single, sharded):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_shard_transports_match():
+    shm = _rollout(ShardedNetworkEnv.grid(6, 6, 3, transport="shm", seed=3))
+    sock = _rollout(ShardedNetworkEnv.grid(6, 6, 3, transport="socket", seed=3))
+    for a, b in zip(shm, sock):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_distributed_training_makes_the_single_process_number_of_updates():
+    lines = []
+    agent = train_distributed(4, 2, max_steps=50, agent_kwargs={"gradient_steps": 2},
+                              log=lines.append)
+    received = int(re.search(r"(\d+) env steps", lines[-1]).group(1))
+
+    # gradient_steps updates per update_every transitions, as in DQNAgent.step
+    assert received >= 4 * 50
+    assert agent.updates == -(-received * agent.gradient_steps // agent.update_every)
+
+
+def test_policy_server_answers_after_bad_lines(tmp_path):
+    torch.manual_seed(0)
+    model = str(tmp_path / "model.pth")
+    torch.save(QNetwork(9, 12).state_dict(), model)
+    sock = str(tmp_path / "policy.sock")
+
+    async def session():
+        server = PolicyServer(model)
+        serving = asyncio.create_task(server.serve(unix_path=sock))
+        while not os.path.exists(sock):
+            await asyncio.sleep(0.01)
+
+        reader, writer = await asyncio.open_unix_connection(sock)
+        writer.write(b"\xff\xfe\n" + b"7\n" + b"x" * 100000 + b"\n"
+                     + json.dumps({"state": [0.0] * 9, "id": 1}).encode() + b"\n")
+        await writer.drain()
+        replies = [json.loads(await asyncio.wait_for(reader.readline(), 10)) for _ in range(4)]
+        writer.close()
+        serving.cancel()
+        return replies
+
+    replies = asyncio.run(session())
+    assert all("error" in reply for reply in replies[:3])
+    assert replies[3]["id"] == 1 and 0 <= replies[3]["action"] < 12
@@ -1,40 +1,189 @@
+import argparse
+import random
+import time
+
 from env.traffic_env import TrafficEnv
+from env.event_env import EventTrafficEnv
 from agent.dqn_agent import DQNAgent
+from agent.checkpoint import AsyncCheckpointer, load_checkpoint
+from telemetry import Telemetry
+import profiling
 import numpy as np
 import torch
 
-env = TrafficEnv()
+episodes = 3000
+max_steps = 200
 
-state_size = len(env.reset())
-action_size = 12
 
-agent = DQNAgent(state_size, action_size)
+def seed_everything(seed):
+    """Seed Python, NumPy's global RNG (TrafficEnv arrivals) and torch."""
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
 
-episodes = 3000
-max_steps = 200
 
-for episode in range(episodes):
-    state = env.reset()
-    total_reward = 0
+def train(agent, env, start_episode=0, checkpointer=None, checkpoint_every=100,
+          telemetry=None, episodes=episodes, max_steps=max_steps, log=print,
+          on_episode=None):
+    """
+    Train agent on env for episodes start_episode..episodes - 1. on_episode,
+    if given, is called as on_episode(episode, total_reward, steps) after
+    every episode; a truthy return value stops training early.
+    """
+    clock = time.perf_counter
+    for episode in range(start_episode, episodes):
+        state = env.reset()
+        total_reward = 0
+        env_seconds = agent_seconds = 0.0
+        updates, loss_sum = agent.updates, agent.loss_sum.clone()
 
-    for step in range(max_steps):
-        action = agent.act(state)
-        next_state, reward, done = env.step(action)
+        for step in range(max_steps):
+            t0 = clock()
+            action = agent.act(state)
+            t1 = clock()
+            next_state, reward, done = env.step(action)
+            t2 = clock()
 
-        agent.step(state, action, reward, next_state, done)
+            agent.step(state, action, reward, next_state, done)
+            t3 = clock()
+            if telemetry:
+                telemetry.step(episode, step, action, reward, env.queues,
+                               t2 - t1, (t1 - t0) + (t3 - t2))
+            env_seconds += t2 - t1
+            agent_seconds += (t1 - t0) + (t3 - t2)
 
-        state = next_state
-        total_reward += reward
+            state = next_state
+            total_reward += reward
 
-        if done:
+            if done:
+                break
+
+        agent.end_episode()
+        if log:
+            log(
+                f"Episode {episode + 1}/{episodes} | "
+                f"Total Reward: {round(total_reward, 2)} | "
+                f"Epsilon: {round(agent.epsilon, 3)}"
+            )
+
+        if telemetry:
+            # gradient steps this episode, however many per learning trigger
+            updates = agent.updates - updates
+            telemetry.episode(
+                episode=episode, steps=step + 1, total_reward=total_reward,
+                mean_loss=(agent.loss_sum - loss_sum).item() / updates if updates else np.nan,
+                updates=updates, epsilon=agent.epsilon,
+                env_seconds=env_seconds, agent_seconds=agent_seconds
+            )
+
+        if checkpointer and (episode + 1) % checkpoint_every == 0:
+            checkpointer.submit(agent, episode)
+
+        if on_episode and on_episode(episode, total_reward, step + 1):
             break
 
-    print(
-        f"Episode {episode + 1}/{episodes} | "
-        f"Total Reward: {round(total_reward, 2)} | "
-        f"Epsilon: {round(agent.epsilon, 3)}"
-    )
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actors", type=int, default=0,
+                        help="rollout processes for actor/learner mode (0 = single process)")
+    parser.add_argument("--actor-threads", type=int, default=1,
+                        help="torch intra-op threads per actor process")
+    parser.add_argument("--learner-threads", type=int, default=None,
+                        help="torch intra-op threads for the learner process")
+    parser.add_argument("--engine", choices=["step", "event"], default="step",
+                        help="step: TrafficEnv; event: second-resolution EventTrafficEnv")
+    parser.add_argument("--buffer-size", type=int, default=100000)
+    parser.add_argument("--replay-dir", default=None,
+                        help="store replay in compact memory-mapped files under this directory")
+    parser.add_argument("--prioritized", action="store_true",
+                        help="proportional prioritized replay (sum-tree) instead of uniform")
+    parser.add_argument("--n-step", type=int, default=1,
+                        help="bootstrap from n-step returns (1 = standard DQN)")
+    parser.add_argument("--double-dqn", action="store_true",
+                        help="select target actions with the local network")
+    parser.add_argument("--gradient-steps", type=int, default=1,
+                        help="gradient steps per learning trigger (every update_every env steps)")
+    parser.add_argument("--compile", action="store_true",
+                        help="torch.compile the TD-loss forward/backward")
+    parser.add_argument("--checkpoint", default="checkpoint.npz",
+                        help="periodic training checkpoint (single-process mode)")
+    parser.add_argument("--checkpoint-every", type=int, default=100,
+                        help="episodes between checkpoints (0 disables them)")
+    parser.add_argument("--resume", action="store_true",
+                        help="restore agent, replay and RNG state from --checkpoint")
+    parser.add_argument("--telemetry", default=None,
+                        help="run directory for columnar step/episode logs (e.g. runs/exp1)")
+    parser.add_argument("--no-step-telemetry", action="store_true",
+                        help="log per-episode records only")
+    parser.add_argument("--profile", default=None,
+                        help=f"write a Chrome trace here and print a phase breakdown "
+                             f"(or set {profiling.ENV_VAR})")
+    args = parser.parse_args()
+
+    profiler = profiling.start(args.profile)
+
+    agent_kwargs = dict(prioritized=args.prioritized, buffer_size=args.buffer_size,
+                        replay_dir=args.replay_dir, n_step=args.n_step,
+                        double_dqn=args.double_dqn, gradient_steps=args.gradient_steps,
+                        compile=args.compile)
+
+    if args.actors > 0:
+        from agent.distributed import train_distributed
+
+        # the learner loop has no episode boundary to checkpoint or log at
+        single_process = [
+            flag for flag, used in (
+                ("--resume", args.resume),
+                ("--checkpoint", args.checkpoint != parser.get_default("checkpoint")),
+                ("--checkpoint-every",
+                 args.checkpoint_every != parser.get_default("checkpoint_every")),
+                ("--telemetry", args.telemetry),
+            ) if used
+        ]
+        if single_process:
+            parser.error(f"{', '.join(single_process)} not supported with --actors")
+
+        agent = train_distributed(
+            episodes, args.actors, max_steps=max_steps,
+            actor_threads=args.actor_threads,
+            learner_threads=args.learner_threads,
+            engine=args.engine, agent_kwargs=agent_kwargs
+        )
+    else:
+        if args.learner_threads:
+            torch.set_num_threads(args.learner_threads)
+
+        env = EventTrafficEnv() if args.engine == "event" else TrafficEnv()
+
+        state_size = len(env.reset())
+        action_size = 12
+
+        agent = DQNAgent(state_size, action_size, **agent_kwargs)
+
+        start_episode = 0
+        if args.resume:
+            start_episode = load_checkpoint(args.checkpoint, agent)
+            print(f"Resumed from {args.checkpoint} at episode {start_episode + 1}")
+
+        telemetry = None
+        if args.telemetry:
+            telemetry = Telemetry(
+                args.telemetry, meta={"script": "train.py", **vars(args)},
+                log_steps=not args.no_step_telemetry
+            )
+
+        checkpointer = None
+        if args.checkpoint_every > 0:
+            checkpointer = AsyncCheckpointer(args.checkpoint)
+        try:
+            train(agent, env, start_episode, checkpointer, args.checkpoint_every, telemetry)
+        finally:
+            if checkpointer:
+                checkpointer.close()
+            if telemetry:
+                telemetry.close()
 
-torch.save(agent.qnetwork_local.state_dict(), "dqn_traffic_model.pth")
-print("Model saved as dqn_traffic_model.pth")
+    torch.save(agent.qnetwork_local.state_dict(), "dqn_traffic_model.pth")
+    print("Model saved as dqn_traffic_model.pth")
+    profiling.finish(profiler)